@@ -1,6 +1,13 @@
 """Основной модуль для расчета показателей экономической эффективности
 проекта строительства жилого комплекса (NPV, IRR, период окупаемости).
-Исходные данные для расчета импортируются из модуля пользовательского интерфейса.
+Исходные данные для расчета передаются в класс Estimation в виде словаря.
+При запуске модуля как скрипта они импортируются из модуля пользовательского интерфейса.
+Импорт модуля не создает окон, не выводит сообщений в консоль и не записывает файлов:
+графики (см. модуль charts) и файл Excel формируются только по запросу.
+Денежный поток рассчитывается в заранее выделенном непрерывном массиве float64
+(строка - показатель, столбец - квартал). Таблица pandas формируется
+только при обращении к атрибуту cash_flow или при сохранении в Excel;
+библиотеки pandas и matplotlib импортируются только в этих случаях.
 Расчет денежного потока производится в поквартальной динамике.
 График продаж квартир рассчитывается автоматически с учетом масштаба проекта,
 ценового класса и типичного распределения спроса по этапам строительства.
@@ -25,58 +32,177 @@
    по банковскому кредиту не учитываются.
 """
 
-import gui  # Модуль пользовательского интерфейса
-from gui import function_info
+from decorators import function_info
+from irr import solve_irr
+from tables import assumptions, sales_period, sales_shares, price_indexes
+import charts
+import timeline
 
-import pandas as pd
 import numpy as np
-from scipy.stats import gamma
-import matplotlib.pyplot as plt
-
-plt.style.use('fivethirtyeight')
-plt.rcParams['figure.figsize'] = 12, 7
-
-# Исходные параметры, заданные пользователем:
-parameters = gui.parameters
-
-# Допущения для планирования темпов продаж:
-assumptions = {
-    'mass_market': {
-        'price_range': [80_000, 120_000],
-        'sales_period': [10, 14],  # Период реализации в кварталах
-        'max_phase_size': 55_000  # Максимальная площадь квартир в одной очереди
-    },
-    'upper_class': {
-        'price_range': [120_000, 150_000],
-        'sales_period': [12, 16],
-        'max_phase_size': 40_000
-    }
+
+# Исходные параметры по умолчанию (соответствуют значениям в окне интерфейса):
+default_parameters = {
+    'floor_area': 10_000,
+    'apartment_area': 7_000,
+    'construction_costs': 60_000,
+    'inflation_annual': 1.05,
+    'construction_period': 10,
+    'start_price': 105_000,
+    'completion_premium': 1.3,
+    'discount_rate_annual': 1.06
 }
 
+# Строки расчетной таблицы денежного потока:
+COLUMNS = ('quarter', 'price_index', 'price', 'sales_sq_m', 'sales_rub', 'revenue',
+           'construction_costs', 'promotion', 'expenses', 'CF', 'discount_coef', 'DCF',
+           'CF_cumsum', 'DCF_cumsum')
+COLUMN_INDEX = {column: index for index, column in enumerate(COLUMNS)}
+
+# Граф зависимостей этапов расчета в порядке их выполнения:
+# (метод, используемые значения, результаты). Значения - ключи словаря parameters,
+# строки расчетной таблицы или атрибуты объекта. При изменении исходных параметров
+# (метод Estimation.update) повторно выполняются только этапы, входные значения
+# которых изменились.
+STAGES = (
+    ('get_quarterly_rates', ('inflation_annual', 'discount_rate_annual'),
+     ('inflation_quarterly', 'discount_rate_quarterly')),
+    ('split_to_phases', ('start_price', 'floor_area', 'apartment_area'),
+     ('price_segment', 'n_phases', 'phase_floor_area', 'phase_apartment_area')),
+    ('phase_sales_period', ('price_segment', 'start_price'), ('sales_period',)),
+    ('sales_sqm', ('construction_period', 'sales_period', 'phase_apartment_area'), ('sales_distribution',)),
+    ('sales_rubles', ('construction_period', 'completion_premium', 'inflation_quarterly',
+                      'sales_period', 'start_price', 'sales_distribution'), ('sales_sq_m', 'sales_rub')),
+    ('get_revenue', ('construction_period', 'sales_rub'), ('revenue',)),
+    ('get_expenses', ('construction_period', 'construction_costs', 'phase_floor_area', 'sales_rub'),
+     ('expenses',)),
+    ('get_metrics', ('revenue', 'expenses', 'discount_rate_quarterly'),
+     ('CF', 'NPV', 'PBP', 'DPBP', 'IRR', 'IRR_code')),
+    ('get_project_metrics', ('price_segment', 'sales_sq_m', 'CF', 'n_phases', 'discount_rate_annual'),
+     ('launch_offset', 'project_NPV', 'project_PBP', 'project_DPBP', 'project_IRR'))
+)
+
 
 class Estimation:
 
     """Класс для расчета показателей экономической эффективности
-    проекта строительства жилого комплекса."""
+    проекта строительства жилого комплекса.
+    Аргументы:
+        pars - словарь исходных параметров (ключи как в default_parameters),
+        plots - формировать и сохранять графики продаж и денежного потока:
+            False - без графиков, True - с выводом в окне (как в прежних версиях),
+            режим ('show', 'agg') или объект charts.Renderer (см. модуль charts),
+        output - путь к файлу Excel для сохранения результатов (None - не сохранять),
+        verbose - выводить в консоль промежуточные сведения о расчете.
+    Результаты расчета доступны в атрибутах metrics, table (массив NumPy,
+    строки в порядке COLUMNS) и cash_flow (таблица pandas, формируется по запросу)."""
 
     @function_info
-    def __init__(self, pars: dict):
-        self.parameters = pars
+    def __init__(self, pars: dict, plots=False, output: str = None, verbose: bool = False):
+        # Копия словаря, чтобы не изменять параметры вызывающего кода:
+        self.parameters = dict(pars)
+        self.renderer = charts.renderer(plots)  # None - графики не строятся
+        self.run = self.renderer.new_run() if self.renderer is not None else None
+        self.output = output
+        self.verbose = verbose
+        self.table = None  # Расчетная таблица денежного потока
         self.estimate_project()
 
+    @classmethod
+    def from_results(cls, parameters: dict, arrays: dict) -> 'Estimation':
+        """Функция восстанавливает объект по сохраненным результатам расчета
+        (см. модуль cache) без повторного расчета и построения графиков.
+        Аргументы:
+            parameters - словарь parameters рассчитанного объекта,
+            arrays - словарь массивов table, sales_distribution, project_cash_flow."""
+        estimation = cls.__new__(cls)
+        estimation.parameters = dict(parameters)
+        estimation.renderer = None
+        estimation.run = None
+        estimation.output = None
+        estimation.verbose = False
+        estimation.table = arrays['table'].copy()
+        estimation.sales_distribution = arrays['sales_distribution'].copy()
+        estimation.project_cash_flow = arrays['project_cash_flow'].copy()
+        estimation.sales_period = len(estimation.sales_distribution)
+        return estimation
+
+    @property
+    def metrics(self) -> dict:
+        """Показатели экономической эффективности проекта."""
+        return {key: self.parameters[key] for key in ('NPV', 'PBP', 'DPBP', 'IRR')}
+
+    @property
+    def project_metrics(self) -> dict:
+        """Показатели экономической эффективности проекта в целом (все очереди)."""
+        return {key: self.parameters[f'project_{key}'] for key in ('NPV', 'PBP', 'DPBP', 'IRR')}
+
+    @property
+    def cash_flow(self) -> 'pd.DataFrame':
+        """Таблица денежного потока по кварталам. Формируется
+        из массива table при каждом обращении."""
+        import pandas as pd
+        cash_flow = pd.DataFrame(self.table.T, columns=COLUMNS)
+        cash_flow['quarter'] = cash_flow['quarter'].astype(int)
+        cash_flow.insert(1, 'status', np.where(cash_flow['quarter'] <= self.parameters['construction_period'],
+                                               'construction', 'completed'))
+        return cash_flow
+
+    def column(self, name: str) -> np.ndarray:
+        """Функция возвращает строку расчетной таблицы (представление без копирования)."""
+        return self.table[COLUMN_INDEX[name]]
+
+    def report(self, message: str):
+        """Функция выводит сообщение в консоль в режиме verbose."""
+        if self.verbose:
+            print(message)
+
     @function_info
     def estimate_project(self):
         """Главная функция класса, агрегирует вызовы всех других функций,
-        сохраняет таблицу с расчетами в файл формата Excel."""
-        self.get_quarterly_rates()
-        self.split_to_phases()
-        self.phase_sales_period()
-        self.sales_sqm()
-        self.sales_rubles()
-        self.get_revenue()
-        self.get_expenses()
-        self.get_metrics()
-        self.save_results()
+        сохраняет таблицу с расчетами в файл формата Excel, если указан путь к файлу."""
+        for stage, _, _ in STAGES:
+            getattr(self, stage)()
+        if self.output is not None:
+            self.save_results()
+
+    def value(self, key: str):
+        """Функция возвращает копию значения из графа этапов STAGES."""
+        if key in self.parameters:
+            return self.parameters[key]
+        if key in COLUMN_INDEX:
+            return self.column(key).copy()
+        return np.copy(getattr(self, key))
+
+    @staticmethod
+    def changed(before, after) -> bool:
+        """Функция сравнивает значения до и после выполнения этапа (NaN равен NaN)."""
+        if isinstance(before, str) or isinstance(after, str):
+            return before != after
+        return not np.array_equal(before, after, equal_nan=True)
+
+    @function_info
+    def update(self, changes: dict) -> list:
+        """Функция изменяет исходные параметры и пересчитывает только этапы,
+        входные значения которых изменились (см. STAGES). Если результаты этапа
+        не изменились, зависящие от них этапы не пересчитываются.
+        Аргументы:
+            changes - словарь с новыми значениями исходных параметров
+                (может содержать и неизменные параметры).
+        Возвращает список выполненных этапов."""
+        dirty = set()
+        for key, value in changes.items():
+            if key not in self.parameters or self.changed(self.parameters[key], value):
+                self.parameters[key] = value
+                dirty.add(key)
+        executed = []
+        for stage, inputs, outputs in STAGES:
+            if dirty.isdisjoint(inputs):
+                continue
+            before = {key: self.value(key) for key in outputs}
+            getattr(self, stage)()
+            executed.append(stage)
+            dirty.update(key for key in outputs if self.changed(before[key], self.value(key)))
+        return executed
 
     @function_info
     def get_quarterly_rates(self):
@@ -88,156 +214,181 @@ class Estimation:
     def split_to_phases(self):
         """Функция определяет количество очередей строительства
         и объем одной очереди в зависимости от ценового класса проекта."""
-        self.parameters['price_segment'] = 'mass_market' if parameters['start_price'] < 120_000 else 'upper_class'
+        self.parameters['price_segment'] = 'mass_market' if self.parameters['start_price'] < 120_000 else 'upper_class'
         phase_limit = assumptions[self.parameters['price_segment']]['max_phase_size']
         self.parameters['n_phases'] = int(self.parameters['apartment_area'] // phase_limit) + 1
         self.parameters['phase_floor_area'] = int(self.parameters['floor_area'] / self.parameters['n_phases'])
         self.parameters['phase_apartment_area'] = int(self.parameters['apartment_area'] / self.parameters['n_phases'])
-        print(f'Количество очередей строительства: {self.parameters["n_phases"]}')
+        self.report(f'Количество очередей строительства: {self.parameters["n_phases"]}')
 
     @function_info
     def phase_sales_period(self):
         """Функция определяет период реализации квартир в одной очереди проекта."""
-        min_price, max_price = assumptions[self.parameters['price_segment']]['price_range']
-        min_quarters, max_quarters = assumptions[self.parameters['price_segment']]['sales_period']
-        # Датафрейм с ценами на старте продаж и соответствующим периодом реализации:
-        sales = pd.DataFrame({'price': [price for price in range(min_price, max_price + 1, 1_000)]})
-        sales['n_quarters'] = np.nan
-        sales.loc[sales['price'] == min_price, 'n_quarters'] = min_quarters
-        sales.loc[sales['price'] == max_price, 'n_quarters'] = max_quarters
-        # Все значения между минимумом и максимумом интерполируем линейно:
-        sales['n_quarters'] = sales['n_quarters'].interpolate()
-        self.sales_period = int(np.ceil(sales.loc[sales['price'] == self.parameters['start_price'],
-                                             'n_quarters'].values[0]))
-        print(f'Период продаж одной очереди: {self.sales_period} кварталов')
+        # Период продаж интерполируется линейно между границами ценового сегмента,
+        # результат запоминается в кэше модуля tables:
+        self.sales_period = sales_period(self.parameters['price_segment'], self.parameters['start_price'])
+        self.report(f'Период продаж одной очереди: {self.sales_period} кварталов')
 
     @function_info
     def sales_sqm(self):
         """Функция вычисляет продаваемую площадь квартир по кварталам в рамках одной очереди."""
-        # Гамма-распределение с пиком на границе 1/3 строительного цикла:
+        # Гамма-распределение с пиком на границе 1/3 строительного цикла
+        # (доли продаж по кварталам берутся из кэша модуля tables):
         peak_quarter = self.parameters['construction_period'] // 3
-        x = np.linspace(gamma.ppf(0.01, peak_quarter),
-                        gamma.ppf(0.99, peak_quarter), self.sales_period)
-        y = gamma.pdf(x, peak_quarter)
-        y_normalized = y / np.sum(y)  # Продажи по кварталам в долях от 1
-        # Датафрейм, где номеру квартала соответствует продаваемая площадь:
-        self.sales_distribution = pd.DataFrame({'quarter': [q for q in range(1, self.sales_period + 1)]})
-        self.sales_distribution['sales_sqm'] = self.parameters['phase_apartment_area'] * y_normalized
-        self.plot_sales()
+        y_normalized = sales_shares(peak_quarter, self.sales_period)
+        # Продаваемая площадь по кварталам 1..sales_period:
+        self.sales_distribution = self.parameters['phase_apartment_area'] * y_normalized
+        if self.renderer is not None:
+            self.plot_sales()
 
     @function_info
     def plot_sales(self):
-        """Функция формирует и сохраняет в файл график продаж одной очереди."""
-        plt.bar(self.sales_distribution['quarter'], self.sales_distribution['sales_sqm'])
-        plt.xlabel('Кварталы')
-        plt.ylabel('Продаваемая площадь, кв. м')
-        plt.title('График продаж по кварталам')
-        price = self.parameters["start_price"]
-        phase_size = self.parameters["phase_apartment_area"]
-        plt.figtext(0.5, 0.8,
-                    f'Цена на старте продаж: {price} руб./кв. м\nОбъем 1 очереди: {phase_size} кв. м',
-                    fontweight="bold")
-        plt.tight_layout()
-        plt.savefig('sales.png', dpi=300)
-        plt.show()
+        """Функция передает на построение график продаж одной очереди
+        (данные копируются, построение выполняет объект renderer)."""
+        self.renderer.submit({
+            'chart': 'sales',
+            'run': self.run,
+            'quarter': np.arange(1, self.sales_period + 1),
+            'sales_sq_m': self.sales_distribution.copy(),
+            'start_price': self.parameters['start_price'],
+            'phase_size': self.parameters['phase_apartment_area']
+        })
 
     @function_info
     def price_indexes(self):
-        """Функция оценивает индексы роста цен по отношению к цене на старте продаж
-        для всего периода реализации квартир в рамках одной очереди проекта."""
-        self.cash_flow = pd.DataFrame({
-            'quarter': [q for q in range(1, self.parameters['construction_period'] + 1)],
-            'status': 'construction'})
-        # Индексы роста цен по отношению к цене на старте:
-        quarterly_increase = self.parameters['completion_premium'] ** (1 / self.parameters['construction_period'])
-        self.cash_flow['price_index'] = quarterly_increase ** self.cash_flow['quarter']
+        """Функция выделяет расчетную таблицу и оценивает индексы роста цен
+        по отношению к цене на старте продаж для всего периода реализации
+        квартир в рамках одной очереди проекта."""
+        construction_period = self.parameters['construction_period']
+        # Выручка поступает в квартале после ввода дома, поэтому период
+        # расчета не может быть короче периода строительства плюс один квартал:
+        n_quarters = max(construction_period + 1, self.sales_period)
+        # Таблица выделяется заново только при изменении количества кварталов:
+        if self.table is None or self.table.shape[1] != n_quarters:
+            self.table = np.zeros((len(COLUMNS), n_quarters))
+        self.column('quarter')[:] = np.arange(1, n_quarters + 1)
+        # Индексы роста цен по отношению к цене на старте (из кэша модуля tables).
         # После сдачи в эксплуатацию цены увеличиваются в пределах инфляции:
-        if self.parameters['construction_period'] < len(self.sales_distribution):
-            after_completion = pd.DataFrame({
-                'quarter': [q for q in range(self.cash_flow['quarter'].max() + 1,
-                                             self.sales_distribution['quarter'].max() + 1)],
-                'status': 'completed'})
-            # Индексы прироста цен к максимальной цене в сданном доме:
-            after_completion['price_index'] = [
-                self.cash_flow['price_index'].max() * self.parameters['inflation_quarterly']
-                ** q for q in range(1, len(after_completion) + 1)]
-            self.cash_flow = self.cash_flow.append(after_completion[['quarter', 'price_index', 'status']],
-                                                   ignore_index=True)
+        self.column('price_index')[:] = price_indexes(construction_period,
+                                                      self.parameters['completion_premium'],
+                                                      self.parameters['inflation_quarterly'],
+                                                      n_quarters)
 
     @function_info
     def sales_rubles(self):
         """Функция подсчитывает денежные поступления от реализации квартир."""
         self.price_indexes()  # Индексы роста цен по кварталам
-        self.cash_flow['price'] = self.cash_flow['price_index'] * self.parameters['start_price']
-        self.cash_flow['sales_sq_m'] = self.sales_distribution['sales_sqm']
-        self.cash_flow['sales_rub'] = self.cash_flow['price'] * self.cash_flow['sales_sq_m']
+        np.multiply(self.column('price_index'), self.parameters['start_price'], out=self.column('price'))
+        sales_sq_m = self.column('sales_sq_m')
+        sales_sq_m[:self.sales_period] = self.sales_distribution
+        sales_sq_m[self.sales_period:] = 0
+        np.multiply(self.column('price'), sales_sq_m, out=self.column('sales_rub'))
 
     @function_info
     def get_revenue(self):
         """Функция подсчитывает выручку при условии, что средства от реализации квартир
         становятся доступны в первый квартал после ввода дома в эксплуатацию."""
-        self.cash_flow['revenue'] = 0
-        indexes_completed = self.cash_flow.loc[self.cash_flow['status'] == 'completed'].index
-        self.cash_flow.loc[indexes_completed, 'revenue'] = self.cash_flow.loc[indexes_completed, 'sales_rub']
-        quarter_after_completion = indexes_completed.min()
-        sales_before_completion = self.cash_flow.loc[:quarter_after_completion - 1, 'sales_rub'].sum()
-        self.cash_flow.loc[quarter_after_completion, 'revenue'] += sales_before_completion
+        construction_period = self.parameters['construction_period']
+        sales_rub = self.column('sales_rub')
+        revenue = self.column('revenue')
+        revenue[:construction_period] = 0
+        revenue[construction_period:] = sales_rub[construction_period:]
+        revenue[construction_period] += sales_rub[:construction_period].sum()
 
     @function_info
     def get_expenses(self):
         """Функция подсчитывает затраты на реализацию проекта."""
         # Затраты на строительство распределены равномерно до ввода в эксплуатацию:
-        self.cash_flow['construction_costs'] = 0
-        self.cash_flow.loc[self.cash_flow['status'] == 'construction', 'construction_costs'] = \
-            self.parameters['construction_costs'] * self.parameters['phase_floor_area'] \
-            / self.parameters['construction_period']
+        construction_period = self.parameters['construction_period']
+        construction_costs = self.column('construction_costs')
+        construction_costs[:construction_period] = self.parameters['construction_costs'] \
+            * self.parameters['phase_floor_area'] / construction_period
+        construction_costs[construction_period:] = 0
         # Затраты на продвижение, рекламу, агентское вознаграждение - процентом от объема продаж:
-        self.cash_flow['promotion'] = self.cash_flow['sales_rub'] * 0.06
-        self.cash_flow['expenses'] = self.cash_flow['construction_costs'] + self.cash_flow['promotion']
+        np.multiply(self.column('sales_rub'), 0.06, out=self.column('promotion'))
+        np.add(construction_costs, self.column('promotion'), out=self.column('expenses'))
 
     @function_info
     def get_metrics(self):
         """Функция вычисляет NPV, период окупаемости
         и внутреннюю норму доходности проекта."""
+        quarter = self.column('quarter')
         # Денежный поток проекта:
-        self.cash_flow['CF'] = self.cash_flow['revenue'] - self.cash_flow['expenses']
+        cf = np.subtract(self.column('revenue'), self.column('expenses'), out=self.column('CF'))
         # Дисконтированный денежный поток проекта:
-        self.cash_flow['discount_coef'] = self.parameters['discount_rate_quarterly'] ** self.cash_flow['quarter']
-        self.cash_flow['DCF'] = self.cash_flow['CF'] / self.cash_flow['discount_coef']
-        for par in ('CF', 'DCF'):
-            self.cash_flow[f'{par}_cumsum'] = self.cash_flow[par].cumsum()
-        self.parameters['NPV'] = int(self.cash_flow['DCF'].sum())  # NPV дисконтированного денежного потока
-        self.parameters['PBP'] = self.cash_flow[self.cash_flow['CF_cumsum'] > 0]['quarter'].min()
-        self.parameters['DPBP'] = self.cash_flow[self.cash_flow['DCF_cumsum'] > 0]['quarter'].min()
-        self.parameters['IRR'] = np.round(np.irr(self.cash_flow['CF']), 3)
-        results = f'NPV = {self.parameters["NPV"]}\nPBP = {self.parameters["PBP"]} кварталов\n' \
-                  f'DPBP = {self.parameters["DPBP"]} кварталов\nIRR = {self.parameters["IRR"]}'
-        self.plot_CF(results)
+        discount_coef = np.power(self.parameters['discount_rate_quarterly'], quarter,
+                                 out=self.column('discount_coef'))
+        dcf = np.divide(cf, discount_coef, out=self.column('DCF'))
+        np.cumsum(cf, out=self.column('CF_cumsum'))
+        np.cumsum(dcf, out=self.column('DCF_cumsum'))
+        self.parameters['NPV'] = int(dcf.sum())  # NPV дисконтированного денежного потока
+        self.parameters['PBP'] = self.payback_period(self.column('CF_cumsum'))
+        self.parameters['DPBP'] = self.payback_period(self.column('DCF_cumsum'))
+        rates, codes = solve_irr(cf)
+        self.parameters['IRR'] = np.round(rates[0], 3)
+        self.parameters['IRR_code'] = int(codes[0])  # Код результата расчета IRR (см. irr.REASONS)
+        if self.renderer is not None:
+            results = f'NPV = {self.parameters["NPV"]}\nPBP = {self.parameters["PBP"]} кварталов\n' \
+                      f'DPBP = {self.parameters["DPBP"]} кварталов\nIRR = {self.parameters["IRR"]}'
+            self.plot_CF(results)
+
+    @function_info
+    def get_project_metrics(self):
+        """Функция рассчитывает денежный поток и показатели проекта в целом:
+        очереди запускаются со сдвигом, когда в предыдущей очереди продана
+        доля площади next_phase_share (см. модуль timeline)."""
+        share = assumptions[self.parameters['price_segment']]['next_phase_share']
+        offset = int(timeline.launch_offset(self.column('sales_sq_m'), share)[0])
+        self.parameters['launch_offset'] = offset
+        self.project_cash_flow = timeline.combine_phase(self.column('CF'), self.parameters['n_phases'], offset)
+        if self.parameters['n_phases'] == 1:
+            # Проект из одной очереди: показатели уже рассчитаны в get_metrics
+            for key in ('NPV', 'PBP', 'DPBP', 'IRR'):
+                self.parameters[f'project_{key}'] = self.parameters[key]
+            self.report(f'Шаг запуска очередей: {offset} кварталов')
+            return
+        results = timeline.project_metrics(self.project_cash_flow, self.parameters['discount_rate_annual'])
+        self.parameters['project_NPV'] = int(results['NPV'][0])
+        for key in ('PBP', 'DPBP'):
+            value = results[key][0]
+            self.parameters[f'project_{key}'] = value if np.isnan(value) else int(value)
+        self.parameters['project_IRR'] = np.round(results['IRR'][0], 3)
+        self.report(f'Шаг запуска очередей: {offset} кварталов')
+
+    def payback_period(self, cumsum: np.ndarray):
+        """Функция возвращает номер первого квартала с положительным
+        накопленным денежным потоком (NaN, если проект не окупается)."""
+        positive = np.flatnonzero(cumsum > 0)
+        return int(self.column('quarter')[positive[0]]) if len(positive) else np.nan
 
     @function_info
     def plot_CF(self, metrics: str):
-        """Функция формирует и сохраняет в файл график с динамикой
-        денежного потока и показателями экономической эффективности проекта."""
-        plt.bar(self.cash_flow['quarter'], self.cash_flow['CF_cumsum'],
-                width=0.4, label='Накопленный денежный поток')
-        plt.bar(self.cash_flow['quarter'] + 0.4, self.cash_flow['DCF_cumsum'],
-                width=0.4, label='Накопленный дисконтированный поток')
-        plt.figtext(0.1, 0.2, metrics, fontweight="bold")
-        plt.legend()
-        plt.xlabel('Кварталы')
-        plt.ylabel('Руб.')
-        plt.title('Показатели эффективности проекта')
-        plt.tight_layout()
-        plt.savefig('cash_flow.png', dpi=300)
-        plt.show()
+        """Функция передает на построение график с динамикой денежного потока
+        и показателями экономической эффективности проекта."""
+        self.renderer.submit({
+            'chart': 'cash_flow',
+            'run': self.run,
+            'quarter': self.column('quarter').copy(),
+            'CF_cumsum': self.column('CF_cumsum').copy(),
+            'DCF_cumsum': self.column('DCF_cumsum').copy(),
+            'metrics': metrics
+        })
 
     @function_info
     def save_results(self):
         """Функция сохраняет результаты расчетов в файл Excel."""
+        import pandas as pd
         input_pars = pd.DataFrame(self.parameters, index=[0])
-        with pd.ExcelWriter('Estimation.xlsx') as writer:
+        with pd.ExcelWriter(self.output) as writer:
             input_pars.T.to_excel(writer, sheet_name='inputs', header=False)
             self.cash_flow.T.to_excel(writer, sheet_name='cash_flow', header=False)
 
 
-result = Estimation(parameters)
+if __name__ == '__main__':
+    import decorators
+    decorators.enable(verbose=True)
+
+    import gui  # Модуль пользовательского интерфейса
+
+    # Исходные параметры, заданные пользователем:
+    result = Estimation(gui.parameters, plots=True, output='Estimation.xlsx', verbose=True)
@@ -0,0 +1,192 @@
+"""Модуль для векторизованного расчета показателей экономической эффективности
+проекта строительства жилого комплекса сразу для множества сценариев.
+Каждый сценарий задается теми же параметрами, что и словарь gui.parameters.
+Параметры передаются в виде массивов одинаковой длины (скаляры транслируются
+на все сценарии). Расчет индексов цен, графика продаж, выручки, затрат,
+дисконтированного денежного потока, NPV, PBP и DPBP выполняется набором
+операций NumPy над двумерными массивами (сценарий x квартал), дополненными
+нулями до максимальной продолжительности расчетного периода.
+Допущения и формулы совпадают с классом NPV_calculator.Estimation.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from irr import solve_irr
+from tables import assumptions, sales_periods, sales_shares as cached_sales_shares
+
+# Ключи исходных параметров сценария (как в gui.parameters):
+PARAMETER_KEYS = ('floor_area', 'apartment_area', 'construction_costs', 'inflation_annual',
+                  'construction_period', 'start_price', 'completion_premium', 'discount_rate_annual')
+
+# Граница между ценовыми сегментами, руб./кв. м:
+UPPER_CLASS_PRICE = 120_000
+
+# Количество сценариев, обрабатываемых за один проход (ограничивает память):
+CHUNK_SIZE = 100_000
+
+# Показатели денежного потока, возвращаемые по кварталам:
+CASH_FLOW_COLUMNS = ('price_index', 'price', 'sales_sq_m', 'sales_rub', 'revenue',
+                     'construction_costs', 'promotion', 'expenses', 'CF', 'DCF')
+
+
+def as_batch(pars: dict) -> dict:
+    """Функция преобразует словарь параметров в словарь одномерных
+    массивов float64 одинаковой длины.
+    Аргументы:
+        pars - словарь со скалярами или массивами для ключей PARAMETER_KEYS."""
+    arrays = {key: np.asarray(pars[key], dtype=np.float64) for key in PARAMETER_KEYS}
+    shape = np.broadcast_shapes(*(array.shape for array in arrays.values()))
+    return {key: np.broadcast_to(array, shape).ravel() for key, array in arrays.items()}
+
+
+def split_to_phases(pars: dict) -> dict:
+    """Функция определяет ценовой сегмент, количество очередей
+    и площадь одной очереди для каждого сценария."""
+    upper = pars['start_price'] >= UPPER_CLASS_PRICE
+    phase_limit = np.where(upper, assumptions['upper_class']['max_phase_size'],
+                           assumptions['mass_market']['max_phase_size'])
+    n_phases = np.floor(pars['apartment_area'] / phase_limit) + 1
+    return {
+        'upper_class': upper,
+        'n_phases': n_phases,
+        'phase_floor_area': np.trunc(pars['floor_area'] / n_phases),
+        'phase_apartment_area': np.trunc(pars['apartment_area'] / n_phases)
+    }
+
+
+def phase_sales_period(start_price: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Функция определяет период реализации квартир одной очереди (в кварталах)
+    линейной интерполяцией между границами ценового сегмента
+    (как в методе Estimation.phase_sales_period)."""
+    periods = np.empty_like(start_price)
+    for segment, mask in (('mass_market', ~upper), ('upper_class', upper)):
+        periods[mask] = sales_periods(start_price[mask], segment)
+    return periods
+
+
+def sales_shares(construction_period: np.ndarray, sales_period: np.ndarray, width: int) -> np.ndarray:
+    """Функция возвращает доли продаж по кварталам (строки суммируются в 1)
+    в виде массива размером (сценарии, width).
+    Распределение берется из кэша модуля tables один раз для каждой уникальной
+    пары (пик продаж, период продаж) и затем раздается сценариям по индексу."""
+    peak_quarter = construction_period // 3
+    combos, inverse = np.unique(np.stack([peak_quarter, sales_period], axis=1),
+                                axis=0, return_inverse=True)
+    table = np.zeros((len(combos), width))
+    for row, (peak, n_quarters) in enumerate(combos.astype(int)):
+        table[row, :n_quarters] = cached_sales_shares(peak, n_quarters)
+    return table[inverse.ravel()]
+
+
+def _estimate(pars: dict, width: int, cash_flows: bool, with_irr: bool) -> dict:
+    """Функция выполняет расчет для одного блока сценариев.
+    Аргументы:
+        pars - словарь одномерных массивов параметров,
+        width - количество кварталов в расчетной таблице,
+        cash_flows - возвращать ли денежный поток по кварталам,
+        with_irr - рассчитывать ли IRR."""
+    phases = split_to_phases(pars)
+    construction_period = pars['construction_period']
+    sales_period = phase_sales_period(pars['start_price'], phases['upper_class'])
+    # Выручка поступает в квартале после ввода дома, поэтому период
+    # расчета не может быть короче периода строительства плюс один квартал:
+    horizon = np.maximum(construction_period + 1, sales_period)
+
+    quarter = np.arange(1, width + 1, dtype=np.float64)
+    construction = quarter <= construction_period[:, None]
+    completed = ~construction & (quarter <= horizon[:, None])
+
+    # Индексы роста цен по отношению к цене на старте продаж:
+    quarterly_increase = pars['completion_premium'] ** (1 / construction_period)
+    max_index = quarterly_increase ** construction_period
+    inflation_quarterly = pars['inflation_annual'] ** (1 / 4)
+    price_index = np.where(construction, quarterly_increase[:, None] ** quarter,
+                           max_index[:, None] * inflation_quarterly[:, None]
+                           ** (quarter - construction_period[:, None]))
+    price_index *= construction | completed
+    price = price_index * pars['start_price'][:, None]
+
+    # Продажи в кв. м и в рублях:
+    sales_sq_m = phases['phase_apartment_area'][:, None] * sales_shares(construction_period, sales_period, width)
+    sales_rub = price * sales_sq_m
+
+    # Выручка: продажи до ввода дома поступают в первый квартал после ввода:
+    revenue = sales_rub * completed
+    rows = np.arange(len(construction_period))
+    revenue[rows, construction_period.astype(np.intp)] += (sales_rub * construction).sum(axis=1)
+
+    # Затраты на строительство и продвижение:
+    construction_costs = construction * (pars['construction_costs'] * phases['phase_floor_area']
+                                         / construction_period)[:, None]
+    promotion = sales_rub * 0.06
+    expenses = construction_costs + promotion
+
+    # Денежный поток и показатели эффективности:
+    cf = revenue - expenses
+    discount_rate_quarterly = pars['discount_rate_annual'] ** (1 / 4)
+    dcf = cf / discount_rate_quarterly[:, None] ** quarter
+    results = {
+        'n_phases': phases['n_phases'],
+        'sales_period': sales_period,
+        'horizon': horizon,
+        'NPV': np.trunc(dcf.sum(axis=1)),
+        'PBP': payback_period(cf),
+        'DPBP': payback_period(dcf)
+    }
+    if with_irr:
+        results['IRR'], results['IRR_code'] = solve_irr(cf)
+    if cash_flows:
+        results.update({
+            'price_index': price_index, 'price': price, 'sales_sq_m': sales_sq_m,
+            'sales_rub': sales_rub, 'revenue': revenue, 'construction_costs': construction_costs,
+            'promotion': promotion, 'expenses': expenses, 'CF': cf, 'DCF': dcf
+        })
+    return results
+
+
+def payback_period(flows: np.ndarray) -> np.ndarray:
+    """Функция возвращает номер первого квартала, в котором накопленный
+    денежный поток становится положительным (NaN, если этого не происходит)."""
+    positive = np.cumsum(flows, axis=1) > 0
+    return np.where(positive.any(axis=1), positive.argmax(axis=1) + 1, np.nan)
+
+
+def estimate_batch(pars: dict, cash_flows: bool = False, with_irr: bool = False,
+                   chunk_size: int = CHUNK_SIZE) -> dict:
+    """Функция рассчитывает показатели эффективности для множества сценариев.
+    Аргументы:
+        pars - словарь параметров (ключи как в gui.parameters) со скалярами
+            или массивами одинаковой длины,
+        cash_flows - добавить в результат денежный поток по кварталам
+            (массивы размером сценарии x кварталы, ключи CASH_FLOW_COLUMNS),
+        with_irr - добавить в результат квартальную IRR и код результата ее расчета,
+        chunk_size - количество сценариев, обрабатываемых за один проход.
+    Возвращает словарь массивов: n_phases, sales_period, horizon, NPV, PBP, DPBP
+    и при необходимости IRR, IRR_code и показатели денежного потока."""
+    pars = as_batch(pars)
+    n = len(pars['construction_period'])
+    # Единая ширина таблицы для всех блоков, чтобы их можно было объединить:
+    upper = pars['start_price'] >= UPPER_CLASS_PRICE
+    width = int(np.max(np.maximum(pars['construction_period'] + 1,
+                                  phase_sales_period(pars['start_price'], upper)), initial=1))
+    chunks = [_estimate({key: array[start:start + chunk_size] for key, array in pars.items()},
+                        width, cash_flows, with_irr)
+              for start in range(0, max(n, 1), chunk_size)]
+    if len(chunks) == 1:
+        return chunks[0]
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+def map_parallel(function, tasks: list, workers: int = None) -> list:
+    """Функция выполняет function для каждого набора аргументов из tasks
+    в пуле процессов и возвращает результаты в исходном порядке.
+    Аргументы:
+        function - функция уровня модуля (должна сериализоваться для передачи в процесс),
+        tasks - список кортежей с аргументами,
+        workers - количество процессов (None - по числу ядер, 1 - расчет в текущем процессе)."""
+    if workers == 1 or len(tasks) <= 1:
+        return [function(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, *zip(*tasks)))
@@ -0,0 +1,191 @@
+"""Скрипт для замера производительности расчета.
+Сравнивает время и пиковый объем выделяемой памяти на один расчет
+для класса Estimation (массивы NumPy) и для прежней схемы расчета,
+в которой таблица pandas наращивалась по столбцам. Дополнительно
+замеряется стоимость формирования таблицы pandas по запросу
+и пропускная способность векторизованного движка batch.estimate_batch.
+С ключом --profile выводится время и объем памяти по этапам расчета
+(см. модуль decorators), статистика сохраняется в файл profile.json,
+трассировка вызовов - в файл trace.json.
+С ключом --cold-start замеряется время запуска нового процесса Python,
+который импортирует модуль NPV_calculator и рассчитывает NPV одного проекта,
+и сравнивается с бюджетом COLD_START_BUDGET.
+Запуск: python benchmark.py [--repeat 200] [--batch 100000] [--profile] [--cold-start]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import decorators
+from NPV_calculator import Estimation, default_parameters
+from batch import estimate_batch
+from irr import solve_irr
+from tables import assumptions, sales_period, sales_shares, price_indexes
+
+# Бюджет времени холодного запуска расчета NPV одного проекта, с:
+COLD_START_BUDGET = 0.6
+
+# Расчет NPV в новом процессе; выводит загруженные тяжелые библиотеки:
+COLD_START_SCRIPT = '''
+import sys
+from NPV_calculator import Estimation, default_parameters
+Estimation(default_parameters).metrics['NPV']
+print(','.join(m for m in ('pandas', 'scipy.stats', 'scipy.special', 'matplotlib') if m in sys.modules))
+'''
+
+# Те же действия при прежнем (немедленном) импорте библиотек:
+EAGER_SCRIPT = 'import pandas, scipy.stats, matplotlib.pyplot\n' + COLD_START_SCRIPT
+
+
+def pandas_pipeline(pars: dict) -> int:
+    """Прежняя схема расчета денежного потока: таблица pandas
+    наращивается по столбцам, выборки выполняются через .loc.
+    Используется как база для сравнения (IRR рассчитывается тем же
+    модулем irr, что и в Estimation). Возвращает NPV."""
+    pars = dict(pars)
+    inflation_quarterly = pars['inflation_annual'] ** (1 / 4)
+    discount_rate_quarterly = pars['discount_rate_annual'] ** (1 / 4)
+    segment = 'mass_market' if pars['start_price'] < 120_000 else 'upper_class'
+    n_phases = int(pars['apartment_area'] // assumptions[segment]['max_phase_size']) + 1
+    phase_floor_area = int(pars['floor_area'] / n_phases)
+    phase_apartment_area = int(pars['apartment_area'] / n_phases)
+    period = sales_period(segment, pars['start_price'])
+    construction_period = pars['construction_period']
+    distribution = pd.DataFrame({'quarter': range(1, period + 1)})
+    distribution['sales_sqm'] = phase_apartment_area * sales_shares(construction_period // 3, period)
+
+    n_quarters = max(construction_period + 1, period)
+    cash_flow = pd.DataFrame({'quarter': range(1, n_quarters + 1)})
+    cash_flow['status'] = 'construction'
+    cash_flow.loc[cash_flow['quarter'] > construction_period, 'status'] = 'completed'
+    cash_flow['price_index'] = price_indexes(construction_period, pars['completion_premium'],
+                                             inflation_quarterly, n_quarters)
+    cash_flow['price'] = cash_flow['price_index'] * pars['start_price']
+    cash_flow['sales_sq_m'] = distribution['sales_sqm']
+    cash_flow['sales_rub'] = cash_flow['price'] * cash_flow['sales_sq_m']
+    cash_flow['revenue'] = 0.0
+    completed = cash_flow.loc[cash_flow['status'] == 'completed'].index
+    cash_flow.loc[completed, 'revenue'] = cash_flow.loc[completed, 'sales_rub']
+    first = completed.min()
+    cash_flow.loc[first, 'revenue'] += cash_flow.loc[:first - 1, 'sales_rub'].sum()
+    cash_flow['construction_costs'] = 0.0
+    cash_flow.loc[cash_flow['status'] == 'construction', 'construction_costs'] = \
+        pars['construction_costs'] * phase_floor_area / construction_period
+    cash_flow['promotion'] = cash_flow['sales_rub'] * 0.06
+    cash_flow['expenses'] = cash_flow['construction_costs'] + cash_flow['promotion']
+    cash_flow['CF'] = cash_flow['revenue'] - cash_flow['expenses']
+    cash_flow['discount_coef'] = discount_rate_quarterly ** cash_flow['quarter']
+    cash_flow['DCF'] = cash_flow['CF'] / cash_flow['discount_coef']
+    for par in ('CF', 'DCF'):
+        cash_flow[f'{par}_cumsum'] = cash_flow[par].cumsum()
+    solve_irr(cash_flow['CF'].to_numpy())
+    return int(cash_flow['DCF'].sum())
+
+
+def measure(function, repeat: int) -> tuple:
+    """Функция возвращает среднее время вызова (мкс)
+    и пиковый объем выделенной памяти за один вызов (КБ)."""
+    function()  # Прогрев кэшей
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    elapsed = (time.perf_counter() - start) / repeat * 1e6
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер производительности расчета NPV.')
+    parser.add_argument('--repeat', type=int, default=200, help='количество повторов одиночного расчета')
+    parser.add_argument('--batch', type=int, default=100_000, help='количество сценариев для пакетного расчета')
+    parser.add_argument('--profile', action='store_true', help='замерить время и память по этапам расчета')
+    parser.add_argument('--cold-start', action='store_true', help='замерить время холодного запуска расчета')
+    args = parser.parse_args()
+
+    print(f'{"Расчет":<40}{"мкс/расчет":>14}{"пик памяти, КБ":>18}')
+    rows = [
+        ('pandas: таблица по столбцам', lambda: pandas_pipeline(default_parameters)),
+        ('Estimation: массивы NumPy', lambda: Estimation(default_parameters)),
+        ('Estimation + таблица pandas по запросу', lambda: Estimation(default_parameters).cash_flow)
+    ]
+    timings = {}
+    for name, function in rows:
+        timings[name] = measure(function, args.repeat)
+        print(f'{name:<40}{timings[name][0]:>14.1f}{timings[name][1]:>18.1f}')
+    baseline, current = timings[rows[0][0]], timings[rows[1][0]]
+    print(f'Ускорение: {baseline[0] / current[0]:.1f}x, '
+          f'сокращение пиковой памяти: {baseline[1] / current[1]:.1f}x')
+
+    pars = dict(default_parameters, start_price=np.linspace(80_000, 150_000, args.batch).round(-3))
+    start = time.perf_counter()
+    estimate_batch(pars, with_irr=True)
+    elapsed = time.perf_counter() - start
+    print(f'batch.estimate_batch: {args.batch} сценариев за {elapsed:.2f} с '
+          f'({args.batch / elapsed:,.0f} сценариев/с)')
+
+    if args.profile:
+        profile(args.repeat)
+    if args.cold_start:
+        cold_start()
+
+
+def run_script(script: str, repeat: int = 5) -> tuple:
+    """Функция запускает script в новых процессах Python и возвращает
+    медианное время выполнения (с) и вывод последнего запуска."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', script], cwd=directory,
+                                capture_output=True, text=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result.stdout.strip()
+
+
+def cold_start():
+    """Функция замеряет время холодного запуска расчета NPV одного проекта."""
+    eager, _ = run_script(EAGER_SCRIPT)
+    lazy, modules = run_script(COLD_START_SCRIPT)
+    print(f'Холодный запуск с импортом pandas, scipy.stats, matplotlib: {eager:.2f} с')
+    print(f'Холодный запуск расчета NPV: {lazy:.2f} с (загружены: {modules or "-"}), '
+          f'бюджет {COLD_START_BUDGET:.2f} с - {"выполнен" if lazy <= COLD_START_BUDGET else "превышен"}')
+
+
+def profile(repeat: int):
+    """Функция выводит время и прирост памяти по этапам расчета Estimation.
+    Время замеряется без отслеживания памяти, память - отдельным проходом."""
+    decorators.enable()
+    for _ in range(repeat):
+        Estimation(default_parameters)
+    timing = decorators.summary()
+    decorators.reset()
+    decorators.enable(memory=True, trace=True)
+    Estimation(default_parameters)
+    memory = decorators.summary()
+    decorators.save_trace('trace.json')
+    decorators.disable()
+    print(f'{"Этап":<45}{"вызовов":>9}{"мкс/вызов":>12}{"пик памяти, Б":>16}')
+    for name, stats in timing.items():
+        print(f'{name.rsplit(".", 1)[-1]:<45}{stats["calls"]:>9}{stats["mean_ms"] * 1000:>12.1f}'
+              f'{memory[name]["peak_bytes"]:>16}')
+    for name, stats in timing.items():
+        stats['peak_bytes'] = memory[name]['peak_bytes']
+        stats['allocated_bytes'] = memory[name]['allocated_bytes'] // memory[name]['calls']
+    with open('profile.json', 'w', encoding='utf-8') as file:
+        json.dump(timing, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
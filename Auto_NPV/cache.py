@@ -0,0 +1,205 @@
+"""Модуль кэширования результатов расчета класса NPV_calculator.Estimation.
+Результат идентифицируется ключом - хэшем SHA-256 канонического представления
+исходных параметров в формате JSON вместе с таблицей допущений
+tables.assumptions, поэтому любое изменение допущений автоматически делает
+прежние записи недействительными. Кэш имеет два уровня:
+    - в памяти процесса (LRU с ограничением количества записей),
+    - на диске (файлы .npz с ограничением суммарного размера; при превышении
+      удаляются записи, к которым дольше всего не обращались). Суммарный
+      размер отслеживается при записи, папка просматривается только
+      при превышении ограничения.
+При попадании в кэш показатели и денежный поток восстанавливаются
+без повторного расчета и без построения графиков.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from NPV_calculator import Estimation
+from tables import assumptions
+
+# Версия формата записей (увеличивается при изменении формул расчета):
+CACHE_VERSION = 1
+
+# Ограничения размера кэша по умолчанию:
+MAX_ENTRIES = 1024
+MAX_BYTES = 256 * 1024 ** 2
+
+# Доля max_bytes, до которой уменьшается кэш на диске при вытеснении
+# (чтобы вытеснение не выполнялось при каждой следующей записи):
+LOW_WATER = 0.9
+
+# Массивы, сохраняемые для каждого расчета:
+ARRAYS = ('table', 'sales_distribution', 'project_cash_flow')
+
+
+def to_builtin(value):
+    """Функция преобразует скаляры NumPy в типы Python для записи в JSON."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Значение типа {type(value).__name__} не может быть записано в JSON')
+
+
+def canonical(value):
+    """Функция приводит числа к единому виду, чтобы 10, 10.0 и np.float64(10)
+    давали одинаковый ключ."""
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    return float(value)
+
+
+def parameters_key(pars: dict) -> str:
+    """Функция возвращает ключ кэша для словаря исходных параметров."""
+    document = {'version': CACHE_VERSION, 'parameters': canonical(pars), 'assumptions': canonical(assumptions)}
+    text = json.dumps(document, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EstimationCache:
+
+    """Класс кэша результатов расчета.
+    Аргументы:
+        max_entries - максимальное количество записей в памяти (0 - без кэша в памяти),
+        directory - папка для записей на диске (None - без кэша на диске),
+        max_bytes - максимальный суммарный размер записей на диске."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, directory: str = None, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_bytes = 0  # Суммарный размер записей на диске
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self.files())
+
+    def estimate(self, pars: dict, plots=False, output: str = None, verbose: bool = False) -> Estimation:
+        """Функция возвращает результат расчета из кэша или выполняет расчет
+        и сохраняет его в кэше. Аргументы - как у класса Estimation;
+        при попадании в кэш графики не строятся, файл Excel записывается,
+        если указан output."""
+        key = parameters_key(pars)
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            estimation = Estimation(pars, plots=plots, output=output, verbose=verbose)
+            self.put(key, estimation.parameters, {name: getattr(estimation, name) for name in ARRAYS})
+            return estimation
+        self.hits += 1
+        estimation = Estimation.from_results(*entry)
+        if output is not None:
+            estimation.output = output
+            estimation.save_results()
+        return estimation
+
+    def get(self, key: str):
+        """Функция возвращает запись (parameters, arrays) или None."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        entry = self.read(key)
+        if entry is not None:
+            self.remember(key, entry)
+        return entry
+
+    def put(self, key: str, parameters: dict, arrays: dict):
+        """Функция сохраняет запись в памяти и на диске."""
+        entry = (dict(parameters), {name: np.array(array) for name, array in arrays.items()})
+        self.remember(key, entry)
+        self.write(key, entry)
+
+    def remember(self, key: str, entry: tuple):
+        """Функция добавляет запись в кэш в памяти с вытеснением самой старой."""
+        if self.max_entries <= 0:
+            return
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def read(self, key: str):
+        """Функция читает запись с диска. Время доступа к файлу обновляется,
+        чтобы при вытеснении учитывался порядок обращений."""
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                parameters = json.loads(str(data['parameters']))
+                arrays = {name: data[name] for name in ARRAYS}
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(path)
+        return parameters, arrays
+
+    def write(self, key: str, entry: tuple):
+        """Функция записывает запись на диск (через временный файл,
+        чтобы параллельные процессы не читали недописанные файлы)."""
+        if self.directory is None:
+            return
+        parameters, arrays = entry
+        path = self.path(key)
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(descriptor, 'wb') as file:
+            np.savez_compressed(file, parameters=json.dumps(parameters, default=to_builtin), **arrays)
+            size = file.tell()
+        try:
+            size -= os.path.getsize(path)  # Запись заменяет прежнюю
+        except OSError:
+            pass
+        os.replace(temporary, path)
+        self.disk_bytes += size
+        if self.disk_bytes > self.max_bytes:
+            self.evict()
+
+    def files(self) -> list:
+        """Функция возвращает записи на диске: список (время доступа, размер, путь)."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # Запись удалена другим процессом
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self):
+        """Функция удаляет записи на диске, к которым дольше всего не обращались,
+        пока суммарный размер превышает LOW_WATER * max_bytes. Размер
+        пересчитывается по папке, так как в нее могут писать другие процессы."""
+        files = self.files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= LOW_WATER * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+    def clear(self):
+        """Функция очищает кэш в памяти и на диске."""
+        self.memory.clear()
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.directory, name))
+            self.disk_bytes = 0
@@ -0,0 +1,216 @@
+"""Модуль для построения графиков продаж и денежного потока проекта.
+Класс Estimation формирует только описание графика (словарь с данными),
+а построение и сохранение выполняет объект Renderer в одном из режимов:
+    - 'none' - графики не строятся (пакетные расчеты),
+    - 'show' - график строится сразу, сохраняется в файл и выводится
+      в окне matplotlib (поведение по умолчанию при plots=True),
+    - 'agg' - графики строятся без окон (Agg) в фоновом потоке,
+      расчет не ждет их сохранения.
+Каждый график строится на собственном объекте Figure, поэтому графики
+последовательных расчетов не накладываются друг на друга. Стиль графиков
+применяется через глобальные параметры matplotlib (rcParams), которые
+читаются и при создании элементов графика, и при его сохранении, поэтому
+построение в обоих режимах выполняется под общей блокировкой STYLE_LOCK.
+Библиотека matplotlib импортируется только при построении первого графика.
+Если режим задан строкой (Estimation(pars, plots='agg')), все расчеты
+используют общий объект Renderer этого режима: один фоновый поток
+и сквозную нумерацию расчетов в именах файлов.
+Пример:
+    renderer = Renderer('agg', directory='charts', dpi=150, file_format='svg',
+                        template='{chart}_{run}')
+    for pars in scenarios:
+        Estimation(pars, plots=renderer)
+    renderer.close()
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import threading
+
+# Режимы построения графиков:
+MODES = ('none', 'show', 'agg')
+
+# Форматы файлов:
+FORMATS = ('png', 'svg')
+
+# Разрешение графиков по умолчанию, точек на дюйм:
+DPI = 100
+
+# Стиль и размер графиков, дюймы:
+STYLE = 'fivethirtyeight'
+FIGURE_SIZE = (12, 7)
+
+# Шаблон имени файла для общих объектов Renderer (файлы расчетов не перезаписываются):
+RUN_TEMPLATE = '{chart}_{run}'
+
+# Блокировка на время применения стиля (изменения rcParams) и построения графика:
+STYLE_LOCK = threading.Lock()
+
+
+def draw_sales(figure, spec: dict):
+    """Функция строит график продаж одной очереди на объекте figure."""
+    axes = figure.subplots()
+    axes.bar(spec['quarter'], spec['sales_sq_m'])
+    axes.set_xlabel('Кварталы')
+    axes.set_ylabel('Продаваемая площадь, кв. м')
+    axes.set_title('График продаж по кварталам')
+    figure.text(0.5, 0.8,
+                f'Цена на старте продаж: {spec["start_price"]} руб./кв. м\n'
+                f'Объем 1 очереди: {spec["phase_size"]} кв. м',
+                fontweight='bold')
+
+
+def draw_cash_flow(figure, spec: dict):
+    """Функция строит график накопленного денежного потока
+    и показателей эффективности проекта на объекте figure."""
+    axes = figure.subplots()
+    axes.bar(spec['quarter'], spec['CF_cumsum'], width=0.4, label='Накопленный денежный поток')
+    axes.bar(spec['quarter'] + 0.4, spec['DCF_cumsum'], width=0.4, label='Накопленный дисконтированный поток')
+    figure.text(0.1, 0.2, spec['metrics'], fontweight='bold')
+    axes.legend()
+    axes.set_xlabel('Кварталы')
+    axes.set_ylabel('Руб.')
+    axes.set_title('Показатели эффективности проекта')
+
+
+DRAW = {'sales': draw_sales, 'cash_flow': draw_cash_flow}
+
+
+class Renderer:
+
+    """Класс для построения и сохранения графиков.
+    Аргументы:
+        mode - режим построения ('none', 'show', 'agg'),
+        directory - папка для сохранения файлов,
+        dpi - разрешение графиков,
+        file_format - формат файлов ('png' или 'svg'),
+        template - шаблон имени файла без расширения; {chart} - название
+            графика ('sales', 'cash_flow'), {run} - порядковый номер расчета."""
+
+    def __init__(self, mode: str = 'agg', directory: str = '.', dpi: int = DPI,
+                 file_format: str = 'png', template: str = '{chart}'):
+        if mode not in MODES:
+            raise ValueError(f'Режим {mode} не поддерживается, доступны: {MODES}')
+        if file_format not in FORMATS:
+            raise ValueError(f'Формат {file_format} не поддерживается, доступны: {FORMATS}')
+        self.mode = mode
+        self.directory = directory
+        self.dpi = dpi
+        self.file_format = file_format
+        self.template = template
+        self.runs = itertools.count(1)
+        self.errors = []
+        self.tasks = None
+        self.worker = None
+
+    def new_run(self) -> int:
+        """Функция возвращает порядковый номер очередного расчета."""
+        return next(self.runs)
+
+    def submit(self, spec: dict):
+        """Функция принимает описание графика: словарь с ключами chart
+        (название графика), run (номер расчета) и данными для построения."""
+        if self.mode == 'none':
+            return
+        if self.mode == 'show':
+            self.show(spec)
+            return
+        if self.worker is None:
+            self.tasks = queue.Queue()
+            self.worker = threading.Thread(target=self.work, name='charts', daemon=True)
+            self.worker.start()
+            # Графики, переданные до завершения программы, будут сохранены:
+            atexit.register(self.close)
+        self.tasks.put(spec)
+
+    def path(self, spec: dict) -> str:
+        name = self.template.format(chart=spec['chart'], run=spec['run'])
+        return os.path.join(self.directory, f'{name}.{self.file_format}')
+
+    def show(self, spec: dict):
+        """Функция строит график в окне matplotlib и сохраняет его в файл."""
+        import matplotlib.pyplot as plt
+        with STYLE_LOCK, plt.style.context(STYLE):
+            figure = plt.figure(figsize=FIGURE_SIZE)
+            DRAW[spec['chart']](figure, spec)
+            figure.tight_layout()
+            figure.savefig(self.path(spec), dpi=self.dpi)
+        plt.show()
+        plt.close(figure)
+
+    def render(self, spec: dict):
+        """Функция строит график без окна (Agg) и сохраняет его в файл."""
+        import matplotlib.style
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        with STYLE_LOCK, matplotlib.style.context(STYLE):
+            figure = Figure(figsize=FIGURE_SIZE)
+            FigureCanvasAgg(figure)
+            DRAW[spec['chart']](figure, spec)
+            figure.tight_layout()
+            figure.savefig(self.path(spec), dpi=self.dpi)
+
+    def work(self):
+        """Функция фонового потока: строит графики из очереди."""
+        while True:
+            spec = self.tasks.get()
+            try:
+                if spec is None:
+                    return
+                self.render(spec)
+            except Exception as error:
+                self.errors.append(error)
+            finally:
+                self.tasks.task_done()
+
+    def wait(self):
+        """Функция ожидает построения всех переданных графиков.
+        Ошибки, возникшие в фоновом потоке, передаются вызывающему коду."""
+        if self.tasks is not None:
+            self.tasks.join()
+        if self.errors:
+            error = self.errors[0]
+            self.errors.clear()
+            raise error
+
+    def close(self):
+        """Функция ожидает построения графиков и останавливает фоновый поток."""
+        try:
+            self.wait()
+        finally:
+            if self.worker is not None:
+                self.tasks.put(None)
+                self.worker.join()
+                self.worker = None
+                self.tasks = None
+                atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Общие объекты Renderer по значению аргумента plots (создаются при первом обращении):
+shared = {}
+shared_lock = threading.Lock()
+
+
+def renderer(plots):
+    """Функция возвращает объект Renderer по значению аргумента plots
+    класса Estimation: True - режим 'show' с разрешением 300 точек на дюйм
+    (как в прежних версиях), строка - режим, объект Renderer - он сам.
+    Для True и строк возвращается общий для всех расчетов объект.
+    Если графики не строятся (False, None, режим 'none'), возвращает None."""
+    if plots is True or isinstance(plots, str):
+        with shared_lock:
+            if plots not in shared:
+                shared[plots] = Renderer('show', dpi=300) if plots is True \
+                    else Renderer(plots, template=RUN_TEMPLATE)
+            plots = shared[plots]
+    if not isinstance(plots, Renderer) or plots.mode == 'none':
+        return None
+    return plots
@@ -0,0 +1,213 @@
+"""Вспомогательные декораторы, общие для модуля пользовательского интерфейса
+и модуля расчета показателей экономической эффективности проекта.
+Модуль не импортирует tkinter и не создает окон, поэтому может
+использоваться при расчетах без графического интерфейса.
+Декоратор function_info регистрирует функцию для замеров и возвращает ее
+без изменений, поэтому в обычном режиме замеры не замедляют расчет.
+После вызова enable() зарегистрированные функции и методы заменяются
+обертками, которые собирают по каждой функции количество вызовов,
+время выполнения и (по желанию) объем выделенной памяти, а также
+последовательность вызовов для просмотра в формате Chrome Trace
+(chrome://tracing, Perfetto). Функция disable() восстанавливает исходные функции.
+Пример:
+    import decorators
+    decorators.enable(memory=True, trace=True)
+    Estimation(parameters)
+    decorators.save_summary('profile.json')
+    decorators.save_trace('trace.json')
+    decorators.disable()
+"""
+
+import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Функции, отмеченные декоратором function_info:
+registry = []
+
+# Замененные функции: (владелец, имя, исходная функция):
+patched = []
+
+# Текущие настройки замеров (None - замеры отключены):
+settings = None
+
+# Накопленная статистика {имя функции: показатели} и события трассировки:
+statistics = {}
+events = []
+
+# Максимальное количество сохраняемых событий трассировки:
+MAX_EVENTS = 1_000_000
+
+# Стек вызовов для учета пикового объема памяти вложенных функций:
+memory_stack = []
+lock = threading.Lock()
+
+
+def function_info(original_function):
+    """Функция-декоратор - регистрирует функцию для замеров.
+    Если замеры уже включены, сразу возвращает обертку с замерами,
+    иначе - исходную функцию.
+    Аргументы:
+        original_function - исходная функция."""
+    registry.append(original_function)
+    if settings is not None:
+        return instrument(original_function)
+    return original_function
+
+
+def qualified_name(function) -> str:
+    return f'{function.__module__}.{function.__qualname__}'
+
+
+def instrument(original_function):
+    """Функция возвращает обертку, которая выполняет замеры при вызове original_function."""
+    name = qualified_name(original_function)
+    verbose, memory, trace = settings['verbose'], settings['memory'], settings['trace']
+
+    @functools.wraps(original_function)
+    def wrapper_function(*args, **kwargs):
+        if verbose:
+            now = datetime.datetime.today()
+            print(f'{now}: вызов функции {original_function.__name__}')
+        if memory:
+            enter_memory()
+        start = time.perf_counter_ns()
+        try:
+            return original_function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            allocated, peak = exit_memory() if memory else (0, 0)
+            record(name, start, elapsed, allocated, peak, trace)
+
+    wrapper_function.__wrapped_original__ = original_function
+    return wrapper_function
+
+
+def enter_memory():
+    """Функция запоминает объем выделенной памяти перед вызовом функции.
+    Пиковый объем вложенного вызова передается вызывающей функции."""
+    current, peak = tracemalloc.get_traced_memory()
+    if memory_stack:
+        memory_stack[-1][1] = max(memory_stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    memory_stack.append([current, current])
+
+
+def exit_memory() -> tuple:
+    """Функция возвращает прирост выделенной памяти за время вызова
+    и прирост пикового объема памяти (в байтах)."""
+    current, peak = tracemalloc.get_traced_memory()
+    start, frame_peak = memory_stack.pop()
+    frame_peak = max(frame_peak, peak)
+    if memory_stack:
+        memory_stack[-1][1] = max(memory_stack[-1][1], frame_peak)
+    tracemalloc.reset_peak()
+    return current - start, frame_peak - start
+
+
+def record(name: str, start: int, elapsed: int, allocated: int, peak: int, trace: bool):
+    """Функция добавляет результаты вызова в статистику и в трассировку."""
+    with lock:
+        stats = statistics.get(name)
+        if stats is None:
+            stats = statistics[name] = {'calls': 0, 'total_ns': 0, 'min_ns': elapsed, 'max_ns': 0,
+                                        'allocated_bytes': 0, 'peak_bytes': 0}
+        stats['calls'] += 1
+        stats['total_ns'] += elapsed
+        stats['min_ns'] = min(stats['min_ns'], elapsed)
+        stats['max_ns'] = max(stats['max_ns'], elapsed)
+        stats['allocated_bytes'] += allocated
+        stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+        if trace and len(events) < MAX_EVENTS:
+            events.append({'name': name.rsplit('.', 1)[-1], 'cat': name, 'ph': 'X',
+                           'ts': start / 1000, 'dur': elapsed / 1000,
+                           'pid': os.getpid(), 'tid': threading.get_ident(),
+                           'args': {'allocated_bytes': allocated, 'peak_bytes': peak}})
+
+
+def owner_of(function):
+    """Функция возвращает объект (модуль или класс), атрибутом которого
+    является функция, или None для вложенных функций."""
+    owner = sys.modules.get(function.__module__)
+    *path, _ = function.__qualname__.split('.')
+    for part in path:
+        owner = getattr(owner, part, None)
+        if owner is None or part == '<locals>':
+            return None
+    return owner
+
+
+def enable(memory: bool = False, trace: bool = False, verbose: bool = False):
+    """Функция включает замеры для всех зарегистрированных функций.
+    Аргументы:
+        memory - замерять объем выделяемой памяти (tracemalloc, замедляет расчет),
+        trace - сохранять события для трассировки в формате Chrome Trace,
+        verbose - выводить в консоль сведения о вызываемых функциях."""
+    global settings
+    disable()
+    settings = {'memory': memory, 'trace': trace, 'verbose': verbose}
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        settings['tracemalloc_started'] = True
+    for function in registry:
+        owner = owner_of(function)
+        name = function.__name__
+        if owner is not None and getattr(owner, name, None) is function:
+            patched.append((owner, name, function))
+            setattr(owner, name, instrument(function))
+
+
+def disable():
+    """Функция отключает замеры и восстанавливает исходные функции.
+    Накопленная статистика сохраняется до вызова reset()."""
+    global settings
+    while patched:
+        owner, name, function = patched.pop()
+        setattr(owner, name, function)
+    if settings is not None and settings.get('tracemalloc_started'):
+        tracemalloc.stop()
+    memory_stack.clear()
+    settings = None
+
+
+def reset():
+    """Функция очищает накопленную статистику и события трассировки."""
+    with lock:
+        statistics.clear()
+        events.clear()
+
+
+def summary() -> dict:
+    """Функция возвращает статистику по функциям: количество вызовов,
+    суммарное, среднее, минимальное и максимальное время (мс),
+    суммарный прирост выделенной памяти и максимальный пиковый прирост (байт).
+    Функции упорядочены по убыванию суммарного времени."""
+    with lock:
+        rows = sorted(statistics.items(), key=lambda item: item[1]['total_ns'], reverse=True)
+        return {name: {'calls': stats['calls'],
+                       'total_ms': stats['total_ns'] / 1e6,
+                       'mean_ms': stats['total_ns'] / stats['calls'] / 1e6,
+                       'min_ms': stats['min_ns'] / 1e6,
+                       'max_ms': stats['max_ns'] / 1e6,
+                       'allocated_bytes': stats['allocated_bytes'],
+                       'peak_bytes': stats['peak_bytes']}
+                for name, stats in rows}
+
+
+def save_summary(path: str):
+    """Функция сохраняет статистику по функциям в файл JSON."""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(summary(), file, ensure_ascii=False, indent=2)
+
+
+def save_trace(path: str):
+    """Функция сохраняет события трассировки в файл JSON формата Chrome Trace."""
+    with lock:
+        trace = {'traceEvents': list(events), 'displayTimeUnit': 'ms'}
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(trace, file, ensure_ascii=False)
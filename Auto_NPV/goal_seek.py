@@ -0,0 +1,164 @@
+"""Модуль для подбора значения параметра, при котором показатель проекта
+достигает целевого уровня (аналог "подбора параметра" в Excel).
+Типичные задачи: цена на старте продаж, себестоимость строительства или
+ставка дисконтирования, при которых NPV = 0 (точка безубыточности),
+либо при которых дисконтированный срок окупаемости (DPBP) равен заданному
+количеству кварталов. Подбор выполняется одновременно для множества проектов
+векторизованным движком batch.estimate_batch: на каждой итерации
+пересчитываются только проекты, для которых решение еще не найдено.
+Распределения продаж между итерациями берутся из кэша модуля tables.
+Для NPV используется метод ложного положения с модификацией Иллинойса,
+для DPBP (ступенчатая функция) - деление отрезка пополам.
+NPV как функция параметра может иметь скачки (период продаж округляется
+до целого количества кварталов, на границе ценовых сегментов меняются
+допущения), поэтому смена знака на отрезке не гарантирует наличия корня:
+если отрезок сжался до точки скачка, а NPV в ней не равен цели, подбор
+завершается с кодом SEEK_DISCONTINUITY.
+"""
+
+import numpy as np
+
+from batch import PARAMETER_KEYS, as_batch, estimate_batch
+from sensitivity import SCALE_RANGES
+
+# Показатели, для которых выполняется подбор:
+TARGETS = ('NPV', 'DPBP')
+
+# Коды результата подбора:
+SEEK_CONVERGED = 0
+SEEK_NO_BRACKET = 1
+SEEK_MAX_ITERATIONS = 2
+SEEK_DISCONTINUITY = 3
+
+STATUSES = {
+    SEEK_CONVERGED: 'решение найдено',
+    SEEK_NO_BRACKET: 'целевое значение не достигается в заданном диапазоне параметра',
+    SEEK_MAX_ITERATIONS: 'превышено количество итераций',
+    SEEK_DISCONTINUITY: 'показатель меняет знак скачком, решения нет'
+}
+
+# Точность по NPV (руб.) и максимальное количество итераций:
+NPV_TOLERANCE = 1.0
+MAX_ITERATIONS = 100
+
+
+def _evaluate(pars: dict, index: np.ndarray, variable: str, x: np.ndarray, target: str) -> np.ndarray:
+    """Функция рассчитывает показатель target для проектов с номерами index
+    при значениях параметра variable, равных x."""
+    subset = {key: array[index] for key, array in pars.items()}
+    subset[variable] = x
+    return estimate_batch(subset)[target]
+
+
+def goal_seek(projects: dict, variable: str, target: str = 'NPV', value: float = 0,
+              bounds: tuple = None, tolerance: float = None, max_iterations: int = MAX_ITERATIONS) -> dict:
+    """Функция подбирает значение параметра, при котором показатель достигает цели.
+    Аргументы:
+        projects - словарь параметров проектов (ключи как в gui.parameters)
+            со скалярами или массивами одинаковой длины,
+        variable - подбираемый параметр, например 'start_price',
+            'construction_costs' или 'discount_rate_annual',
+        target - показатель: 'NPV' или 'DPBP',
+        value - целевое значение показателя (для DPBP - номер квартала),
+        bounds - диапазон поиска (минимум, максимум); скаляры или массивы
+            по проектам, по умолчанию диапазон виджета в окне интерфейса,
+        tolerance - точность по значению параметра (по умолчанию 1e-9 от ширины диапазона),
+        max_iterations - максимальное количество итераций.
+    Для DPBP возвращается граничное значение параметра, при котором
+    дисконтированный срок окупаемости не превышает value кварталов.
+    Возвращает словарь массивов: value (NaN, если решение не найдено;
+    для SEEK_DISCONTINUITY - положение скачка), residual (отклонение
+    показателя от цели при значении value), iterations, converged, status
+    (коды STATUSES)."""
+    if variable not in PARAMETER_KEYS or variable == 'construction_period':
+        raise ValueError(f'Параметр {variable} не может быть подобран')
+    if target not in TARGETS:
+        raise ValueError(f'Показатель {target} не поддерживается, доступны: {TARGETS}')
+    pars = as_batch(projects)
+    n = len(pars[variable])
+    low, high = SCALE_RANGES[variable] if bounds is None else bounds
+    low = np.broadcast_to(np.asarray(low, dtype=np.float64), n).copy()
+    high = np.broadcast_to(np.asarray(high, dtype=np.float64), n).copy()
+    if tolerance is None:
+        tolerance = 1e-9 * np.max(high - low)
+
+    everyone = np.arange(n)
+    if target == 'NPV':
+        f_low = _evaluate(pars, everyone, variable, low, target) - value
+        f_high = _evaluate(pars, everyone, variable, high, target) - value
+        bracketed = np.sign(f_low) * np.sign(f_high) <= 0
+    else:
+        # Признак достижения цели; NaN (проект не окупается) - цель не достигнута:
+        f_low = (_evaluate(pars, everyone, variable, low, target) <= value).astype(np.float64)
+        f_high = (_evaluate(pars, everyone, variable, high, target) <= value).astype(np.float64)
+        bracketed = f_low != f_high
+
+    solution = np.full(n, np.nan)
+    residual = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=int)
+    status = np.where(bracketed, SEEK_MAX_ITERATIONS, SEEK_NO_BRACKET)
+    # Проекты, у которых цель достигается точно на границе диапазона:
+    if target == 'NPV':
+        for bound, f_bound in ((low, f_low), (high, f_high)):
+            exact = bracketed & (np.abs(f_bound) < NPV_TOLERANCE) & (status != SEEK_CONVERGED)
+            solution[exact], residual[exact], status[exact] = bound[exact], f_bound[exact], SEEK_CONVERGED
+
+    active = np.flatnonzero(status == SEEK_MAX_ITERATIONS)
+    low, high, f_low, f_high = low[active], high[active], f_low[active], f_high[active]
+    # Номер конца отрезка, сохранявшегося на предыдущей итерации (для модификации Иллинойса):
+    retained = np.zeros(len(active), dtype=int)
+    for iteration in range(1, max_iterations + 1):
+        if len(active) == 0:
+            break
+        if target == 'NPV':
+            # Метод ложного положения, при вырожденном шаге - деление пополам:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = (low * f_high - high * f_low) / (f_high - f_low)
+            x = np.where(np.isfinite(x) & (x > low) & (x < high), x, (low + high) / 2)
+            f_x = _evaluate(pars, active, variable, x, target) - value
+        else:
+            x = (low + high) / 2
+            f_x = (_evaluate(pars, active, variable, x, target) <= value).astype(np.float64)
+        iterations[active] = iteration
+
+        to_low = np.sign(f_x) == np.sign(f_low) if target == 'NPV' else f_x == f_low
+        # Модификация Иллинойса: если один конец сохраняется две итерации подряд,
+        # значение функции в нем уменьшается вдвое:
+        if target == 'NPV':
+            f_high = np.where(to_low & (retained == 1), f_high / 2, f_high)
+            f_low = np.where(~to_low & (retained == -1), f_low / 2, f_low)
+            retained = np.where(to_low, 1, -1)
+        low, f_low = np.where(to_low, x, low), np.where(to_low, f_x, f_low)
+        high, f_high = np.where(to_low, high, x), np.where(to_low, f_high, f_x)
+
+        if target == 'NPV':
+            done = (np.abs(f_x) < NPV_TOLERANCE) | (high - low <= tolerance)
+            found = np.where(np.abs(f_x) < NPV_TOLERANCE, x, (low + high) / 2)
+            # Отклонение в середине сжавшегося отрезка рассчитывается после цикла:
+            found_residual = np.where(np.abs(f_x) < NPV_TOLERANCE, f_x, np.nan)
+        else:
+            done = high - low <= tolerance
+            # Граница со стороны, на которой цель достигнута:
+            found = np.where(f_low == 1, low, high)
+            found_residual = np.full(len(active), np.nan)
+        solution[active[done]] = found[done]
+        residual[active[done]] = found_residual[done]
+        status[active[done]] = SEEK_CONVERGED
+        keep = ~done
+        active, low, high, f_low, f_high, retained = \
+            active[keep], low[keep], high[keep], f_low[keep], f_high[keep], retained[keep]
+
+    # Отклонение показателя от цели при возвращаемом значении параметра:
+    subset = np.flatnonzero((status == SEEK_CONVERGED) & np.isnan(residual))
+    residual[subset] = _evaluate(pars, subset, variable, solution[subset], target) - value
+    if target == 'NPV':
+        # Отрезок сжался до точки скачка, а не до корня:
+        jump = subset[~(np.abs(residual[subset]) < NPV_TOLERANCE)]
+        status[jump] = SEEK_DISCONTINUITY
+    return {
+        'value': solution,
+        'residual': residual,
+        'iterations': iterations,
+        'converged': status == SEEK_CONVERGED,
+        'status': status
+    }
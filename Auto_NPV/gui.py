@@ -4,12 +4,22 @@
 проекта строительства жилого комплекса: себестоимость строительства,
 общая и жилая площадь здания, средняя стоимость кв. метра на старте продаж,
 продолжительность строительства, ставка дисконтирования и др.
+В режиме пересчета при изменении параметров показатели проекта
+выводятся в окне и обновляются при перемещении ползунков: расчет выполняется
+в фоновом потоке после короткой паузы (чтобы не пересчитывать каждое
+промежуточное положение ползунка), и повторно выполняются только этапы
+расчета, зависящие от измененных параметров (см. Estimation.update).
 """
 
-import datetime
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import messagebox
 
+from decorators import function_info
+from NPV_calculator import Estimation
+
 if __name__ == '__main__':
     print('Запуск скрипта "gui.py".')
 else:
@@ -36,23 +46,19 @@ COMBO_WIDTH = 16
 SCALE_WIDTH = 200
 BACKGROUND = '#80c1ff'
 
-window = tk.Tk()
-window.geometry('600x600')
-window.title('Экономическая эффективность проекта')
-
-
-def function_info(original_function):
-    """Функция-декоратор - выводит в консоль информацию
-    о вызываемой функции, дату и время вызова функции.
-    Аргументы:
-        original_function - исходная функция."""
+# Пауза после изменения параметра до запуска пересчета и период
+# проверки готовности результатов фонового расчета, мс:
+DEBOUNCE_MS = 30
+POLL_MS = 10
 
-    def wrapper_function(*args, **kwargs):
-        now = datetime.datetime.today()
-        print(f'{now}: вызов функции {original_function.__name__}')
-        return original_function(*args, **kwargs)
+# Очереди для обмена данными с потоком пересчета:
+live_requests = queue.Queue()
+live_results = queue.Queue()
+pending_job = None  # Отложенный запуск пересчета (window.after)
 
-    return wrapper_function
+window = tk.Tk()
+window.geometry('600x700')
+window.title('Экономическая эффективность проекта')
 
 
 @function_info
@@ -115,6 +121,88 @@ def get_entries():
         window.destroy()  # Закрываем интерактивное окно программы.
 
 
+def read_parameters():
+    """Функция возвращает словарь параметров по текущим значениям виджетов.
+    Если в полях ввода не целые положительные числа, возвращает None
+    (сообщения об ошибках в режиме пересчета не выводятся)."""
+    try:
+        areas = int(entry_floor_area.get()), int(entry_apartment_area.get())
+    except ValueError:
+        return None
+    if min(areas) <= 0:
+        return None
+    return {
+        'floor_area': areas[0],
+        'apartment_area': areas[1],
+        'construction_costs': scale_construction_cost.get(),
+        'inflation_annual': 1 + scale_inflation.get() / 100,
+        'construction_period': scale_construction_period.get(),
+        'start_price': scale_start_price.get(),
+        'completion_premium': 1 + scale_completion_premium.get() / 100,
+        'discount_rate_annual': 1 + scale_discount_rate.get() / 100
+    }
+
+
+def schedule_estimation(*args):
+    """Функция откладывает пересчет на DEBOUNCE_MS мс. При повторном изменении
+    параметров в течение паузы предыдущий запуск отменяется."""
+    global pending_job
+    if pending_job is not None:
+        window.after_cancel(pending_job)
+    pending_job = window.after(DEBOUNCE_MS, submit_estimation)
+
+
+def submit_estimation():
+    """Функция передает текущие параметры в поток пересчета."""
+    global pending_job
+    pending_job = None
+    pars = read_parameters()
+    if live_var.get() and pars is not None:
+        live_requests.put(pars)
+
+
+def live_worker():
+    """Функция потока пересчета. Объект Estimation создается при первом запросе,
+    далее пересчитываются только этапы, зависящие от измененных параметров.
+    Если за время расчета поступило несколько запросов, рассчитывается последний."""
+    estimation = None
+    while True:
+        pars = live_requests.get()
+        while not live_requests.empty():
+            pars = live_requests.get_nowait()
+        start = time.perf_counter()
+        try:
+            if estimation is None:
+                estimation = Estimation(pars)
+                stages = None
+            else:
+                stages = estimation.update(pars)
+            elapsed = (time.perf_counter() - start) * 1000
+            live_results.put((estimation.metrics, estimation.project_metrics, stages, elapsed))
+        except Exception as e:
+            estimation = None
+            live_results.put(e)
+
+
+def poll_results():
+    """Функция выводит в окне результаты, подготовленные потоком пересчета."""
+    result = None
+    while not live_results.empty():
+        result = live_results.get_nowait()
+    if isinstance(result, Exception):
+        results_label.configure(text=f'Ошибка расчета: {result}')
+    elif result is not None:
+        metrics, project_metrics, stages, elapsed = result
+        stages = 'все этапы' if stages is None else f'этапов: {len(stages)}'
+        results_label.configure(
+            text=f'Очередь: NPV = {metrics["NPV"]:,} руб., IRR = {metrics["IRR"]}, '
+                 f'PBP = {metrics["PBP"]}, DPBP = {metrics["DPBP"]}\n'
+                 f'Проект: NPV = {project_metrics["NPV"]:,} руб., IRR = {project_metrics["IRR"]}, '
+                 f'PBP = {project_metrics["PBP"]}, DPBP = {project_metrics["DPBP"]}\n'
+                 f'Пересчет ({stages}): {elapsed:.1f} мс')
+    window.after(POLL_MS, poll_results)
+
+
 # Текстовое поле с инструкциями для пользователя:
 text_1 = """Введите исходные данные для расчета или оставьте значения,
 заданные по умолчанию.
@@ -208,6 +296,24 @@ exit_button = tk.Button(window, text='Запустить расчет', font=FON
                         bg='#d90d1b', fg='white', command=get_entries)
 exit_button.grid(column=0, row=4, columnspan=2, padx=PAD, pady=PAD)
 
+# Режим пересчета показателей при изменении параметров:
+live_var = tk.BooleanVar(value=True)
+live_check = tk.Checkbutton(window, text='Пересчитывать показатели при изменении параметров',
+                            variable=live_var, font=FONTSIZE_SMALL, command=schedule_estimation)
+live_check.grid(column=0, row=5, columnspan=2, padx=PAD, pady=PAD)
+results_label = tk.Label(window, text='', font=FONTSIZE_SMALL, justify='left')
+results_label.grid(column=0, row=6, columnspan=2, padx=PAD, pady=PAD)
+
+for scale in (scale_construction_period, scale_construction_cost, scale_start_price,
+              scale_completion_premium, scale_inflation, scale_discount_rate):
+    scale.configure(command=schedule_estimation)
+for entry in (entry_floor_area, entry_apartment_area):
+    entry.bind('<KeyRelease>', schedule_estimation)
+
+threading.Thread(target=live_worker, name='live', daemon=True).start()
+schedule_estimation()
+poll_results()
+
 window.mainloop()
 
 # Для передачи параметров в главный модуль создается словарь:
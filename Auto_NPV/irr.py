@@ -0,0 +1,172 @@
+"""Модуль для расчета внутренней нормы доходности (IRR) проекта.
+Заменяет функцию np.irr, удаленную из NumPy. Работает с двумерным массивом
+денежных потоков (одна строка - один сценарий), первый поток строки
+относится к моменту 0, ставка возвращается в расчете на период (квартал).
+Алгоритм:
+1. По правилу знаков Декарта строки с одной сменой знака потоков имеют
+   единственный корень при ставке больше -100%, строки без смены знака
+   корня не имеют.
+2. Для строк с несколькими сменами знака корни отделяются на сетке ставок:
+   при нескольких корнях возвращается NaN.
+3. Корень уточняется методом Ньютона с защитой отрезком локализации:
+   если шаг Ньютона выходит за пределы отрезка, выполняется деление пополам.
+Для каждой строки возвращается код результата (см. REASONS).
+"""
+
+import numpy as np
+
+# Коды результата расчета IRR:
+IRR_OK = 0
+IRR_NO_SIGN_CHANGE = 1
+IRR_NO_ROOT_IN_RANGE = 2
+IRR_MULTIPLE_ROOTS = 3
+IRR_NOT_CONVERGED = 4
+
+REASONS = {
+    IRR_OK: 'IRR найдена',
+    IRR_NO_SIGN_CHANGE: 'денежный поток не меняет знак, IRR не существует',
+    IRR_NO_ROOT_IN_RANGE: 'корень вне диапазона поиска ставок',
+    IRR_MULTIPLE_ROOTS: 'несколько значений IRR',
+    IRR_NOT_CONVERGED: 'итерационный процесс не сошелся'
+}
+
+# Границы поиска ставки за период:
+RATE_MIN = -0.99
+RATE_MAX = 10.0
+
+# Количество узлов сетки для отделения корней
+# (равномерно по логарифму коэффициента наращения 1 + r):
+GRID_SIZE = 200
+
+# До этого количества сценариев NPV считается через матрицу степеней
+# (меньше вызовов NumPy), для больших блоков - по схеме Горнера (меньше памяти):
+SMALL_BATCH = 64
+
+# Точность по ставке и максимальное количество итераций:
+TOLERANCE = 1e-12
+MAX_ITERATIONS = 100
+
+
+def npv_at_rate(cash_flows: np.ndarray, rate: np.ndarray) -> tuple:
+    """Функция вычисляет приведенную стоимость денежных потоков и ее
+    производную по ставке.
+    Аргументы:
+        cash_flows - массив размером (сценарии, периоды),
+        rate - массив ставок для каждого сценария.
+    Возвращает кортеж (NPV, dNPV/dr)."""
+    return _horner(np.ascontiguousarray(np.asarray(cash_flows, dtype=np.float64).T), rate)
+
+
+def _horner(columns: np.ndarray, rate: np.ndarray) -> tuple:
+    """Функция вычисляет NPV и производную по ставке по схеме Горнера.
+    Потоки передаются в транспонированном виде (периоды, сценарии),
+    чтобы каждый период был непрерывным участком памяти."""
+    factor = 1 / (1 + rate)
+    if columns.shape[1] <= SMALL_BATCH:
+        periods = np.arange(len(columns))[:, None]
+        with np.errstate(over='ignore', invalid='ignore'):
+            discounted = columns * factor ** periods
+            return discounted.sum(axis=0), -(periods * discounted).sum(axis=0) * factor
+    value = np.zeros(columns.shape[1])
+    derivative = np.zeros(columns.shape[1])
+    # При ставках, близких к -100%, длинные ряды могут давать переполнение,
+    # знак бесконечного значения при этом остается корректным:
+    with np.errstate(over='ignore', invalid='ignore'):
+        for column in columns[::-1]:
+            derivative *= factor
+            derivative += value
+            value *= factor
+            value += column
+    # Производная по ставке: d(factor)/dr = -factor ** 2
+    return value, -derivative * factor ** 2
+
+
+def sign_changes(cash_flows: np.ndarray) -> np.ndarray:
+    """Функция подсчитывает количество смен знака в каждой строке
+    денежных потоков без учета нулевых значений."""
+    signs = np.sign(cash_flows)
+    # Нулевые потоки наследуют знак предыдущего ненулевого потока:
+    positions = np.where(signs != 0, np.arange(signs.shape[1]), 0)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    filled = np.take_along_axis(signs, positions, axis=1)
+    return np.sum((filled[:, 1:] * filled[:, :-1]) < 0, axis=1)
+
+
+def bracket_on_grid(cash_flows: np.ndarray) -> tuple:
+    """Функция отделяет корни на сетке ставок.
+    Возвращает количество найденных смен знака NPV и границы
+    первого найденного отрезка для каждой строки."""
+    grid = np.expm1(np.linspace(np.log1p(RATE_MIN), np.log1p(RATE_MAX), GRID_SIZE))
+    with np.errstate(over='ignore', invalid='ignore'):
+        powers = (1 / (1 + grid))[:, None] ** np.arange(cash_flows.shape[1])
+        values = cash_flows @ powers.T
+    crossings = np.sign(values[:, 1:]) * np.sign(values[:, :-1]) < 0
+    first = crossings.argmax(axis=1)
+    return crossings.sum(axis=1), grid[first], grid[first + 1]
+
+
+def solve_irr(cash_flows: np.ndarray) -> tuple:
+    """Функция рассчитывает IRR для каждой строки массива денежных потоков.
+    Аргументы:
+        cash_flows - одномерный массив (один сценарий) или массив размером
+            (сценарии, периоды).
+    Возвращает кортеж из массива ставок за период (NaN, если IRR не определена)
+    и массива кодов результата (ключи словаря REASONS)."""
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    n = len(cash_flows)
+    rates = np.full(n, np.nan)
+    codes = np.full(n, IRR_OK)
+    low = np.full(n, RATE_MIN)
+    high = np.full(n, RATE_MAX)
+
+    changes = sign_changes(cash_flows)
+    codes[changes == 0] = IRR_NO_SIGN_CHANGE
+    # Для строк с несколькими сменами знака корни отделяются на сетке:
+    several = np.flatnonzero(changes > 1)
+    if len(several):
+        n_roots, low[several], high[several] = bracket_on_grid(cash_flows[several])
+        codes[several[n_roots == 0]] = IRR_NO_ROOT_IN_RANGE
+        codes[several[n_roots > 1]] = IRR_MULTIPLE_ROOTS
+
+    active = np.flatnonzero(codes == IRR_OK)
+    columns = np.ascontiguousarray(cash_flows[active].T)
+    low, high = low[active], high[active]
+    value_low = _horner(columns, low)[0]
+    value_high = _horner(columns, high)[0]
+    # Единственный корень может лежать за пределами диапазона поиска:
+    outside = np.sign(value_low) * np.sign(value_high) > 0
+    codes[active[outside]] = IRR_NO_ROOT_IN_RANGE
+    keep = ~outside
+    active, columns, low, high, value_low = active[keep], columns[:, keep], low[keep], high[keep], value_low[keep]
+
+    rate = np.clip(np.zeros(len(active)), low, high)
+    for _ in range(MAX_ITERATIONS):
+        if len(active) == 0:
+            break
+        value, derivative = _horner(columns, rate)
+        # Сужаем отрезок локализации по знаку NPV в текущей точке:
+        same_sign = np.sign(value) == np.sign(value_low)
+        low = np.where(same_sign, rate, low)
+        value_low = np.where(same_sign, value, value_low)
+        high = np.where(same_sign, high, rate)
+        # Шаг Ньютона, при выходе за отрезок - деление пополам:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = rate - value / derivative
+        done = (np.abs(newton - rate) <= TOLERANCE * (1 + np.abs(rate))) | (value == 0)
+        inside = np.isfinite(newton) & (newton >= low) & (newton <= high)
+        rate = np.where(inside | done & np.isfinite(newton), newton, (low + high) / 2)
+        done |= high - low <= TOLERANCE
+        # Сошедшиеся строки исключаются из дальнейших итераций:
+        rates[active[done]] = rate[done]
+        keep = ~done
+        if not keep.all():
+            active, columns, rate = active[keep], columns[:, keep], rate[keep]
+            low, high, value_low = low[keep], high[keep], value_low[keep]
+    codes[active] = IRR_NOT_CONVERGED
+    return rates, codes
+
+
+def irr(cash_flows: np.ndarray) -> np.ndarray:
+    """Функция возвращает IRR за период для каждой строки денежных потоков
+    (NaN, если IRR не определена). Коды результата возвращает solve_irr."""
+    return solve_irr(cash_flows)[0]
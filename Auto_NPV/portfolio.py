@@ -0,0 +1,203 @@
+"""Скрипт для пакетной переоценки портфеля проектов из командной строки.
+Входной файл (CSV или Parquet) содержит по одной строке на проект со столбцами,
+совпадающими с ключами gui.parameters; прочие столбцы (например, код проекта)
+переносятся в результат без изменений. Файл читается блоками, блоки
+рассчитываются векторизованным движком в пуле процессов, при этом в обработке
+одновременно находится ограниченное количество блоков, а результаты
+дописываются в выходные файлы по мере готовности в исходном порядке строк.
+Таким образом, портфель целиком в памяти не хранится.
+Запуск:
+    python portfolio.py projects.csv metrics.csv [--cash-flows cash_flows.csv]
+        [--project] [--chunk-size 10000] [--workers 4] [--in-flight 8]
+Для чтения и записи Parquet требуется пакет pyarrow.
+"""
+
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch import CASH_FLOW_COLUMNS, PARAMETER_KEYS, estimate_batch
+from timeline import estimate_timeline
+
+# Количество проектов в одном блоке:
+CHUNK_SIZE = 10_000
+
+# Показатели проекта, записываемые в файл результатов:
+METRICS = ('n_phases', 'NPV', 'PBP', 'DPBP', 'IRR', 'IRR_code')
+
+
+def is_parquet(path: str) -> bool:
+    """Функция определяет формат файла по расширению."""
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def read_chunks(path: str, chunk_size: int):
+    """Генератор возвращает блоки входного файла в виде DataFrame."""
+    if is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Для чтения Parquet требуется пакет pyarrow') from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class Writer:
+    """Класс для последовательной записи блоков DataFrame в CSV или Parquet.
+    Файл создается при записи первого блока, последующие блоки дописываются."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self.writer = None
+        self.started = False
+
+    def write(self, frame):
+        """Метод дописывает блок в файл. Для CSV блок может быть передан
+        готовым текстом с заголовком (см. serialize)."""
+        if isinstance(frame, str):
+            if self.started:
+                frame = frame[frame.index('\n') + 1:]
+            with open(self.path, 'a' if self.started else 'w', newline='') as file:
+                file.write(frame)
+        elif self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self.started else 'w', header=not self.started, index=False)
+        self.started = True
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def evaluate_chunk(frame: pd.DataFrame, first_row: int, project: bool, cash_flows: bool) -> tuple:
+    """Функция рассчитывает показатели для блока проектов.
+    Аргументы:
+        frame - блок входного файла,
+        first_row - номер первой строки блока во входном файле,
+        project - рассчитывать показатели проекта в целом (все очереди),
+        cash_flows - сформировать денежные потоки в длинном формате
+            (строка, квартал, показатели).
+    Возвращает кортеж (показатели, денежные потоки или None)."""
+    missing = [key for key in PARAMETER_KEYS if key not in frame.columns]
+    if missing:
+        raise KeyError(f'Во входном файле отсутствуют столбцы: {", ".join(missing)}')
+    pars = {key: frame[key].to_numpy(dtype=np.float64) for key in PARAMETER_KEYS}
+    if project:
+        results = estimate_timeline(pars, with_irr=True, cash_flows=cash_flows)
+    else:
+        results = estimate_batch(pars, cash_flows=cash_flows, with_irr=True)
+
+    rows = np.arange(first_row, first_row + len(frame))
+    metrics = frame.drop(columns=list(PARAMETER_KEYS)).reset_index(drop=True)
+    metrics.insert(0, 'row', rows)
+    for key in METRICS:
+        metrics[key] = results[key]
+    if project:
+        metrics['launch_offset'] = results['launch_offset']
+
+    flows = None
+    if cash_flows:
+        columns = ('CF', 'DCF') if project else CASH_FLOW_COLUMNS
+        width = results['CF'].shape[1]
+        if project:
+            # Продолжительность проекта - до последнего квартала с ненулевым потоком:
+            nonzero = results['CF'] != 0
+            horizon = width - np.argmax(nonzero[:, ::-1], axis=1)
+        else:
+            horizon = results['horizon'].astype(np.intp)
+        mask = np.arange(width) < horizon[:, None]
+        row_index, quarter_index = np.nonzero(mask)
+        flows = pd.DataFrame({'row': rows[row_index], 'quarter': quarter_index + 1})
+        for key in columns:
+            flows[key] = results[key][mask]
+    return metrics, flows
+
+
+def serialize(frame: pd.DataFrame, path: str):
+    """Функция преобразует блок в текст CSV (с заголовком), если он записывается
+    в CSV, чтобы форматирование выполнялось в процессе пула, а не в основном процессе."""
+    return frame if is_parquet(path) else frame.to_csv(index=False)
+
+
+def process_chunk(frame: pd.DataFrame, first_row: int, project: bool, paths: list) -> list:
+    """Функция рассчитывает блок проектов и подготавливает результаты к записи
+    в файлы paths (показатели и при необходимости денежные потоки)."""
+    results = evaluate_chunk(frame, first_row, project, len(paths) > 1)
+    return [serialize(result, path) for result, path in zip(results, paths)]
+
+
+def run(source: str, output: str, cash_flows: str = None, project: bool = False,
+        chunk_size: int = CHUNK_SIZE, workers: int = None, in_flight: int = None) -> int:
+    """Функция выполняет пакетный расчет портфеля и возвращает количество проектов.
+    Аргументы:
+        source - входной файл CSV или Parquet,
+        output - файл для показателей проектов,
+        cash_flows - файл для денежных потоков в длинном формате (None - не записывать),
+        project - рассчитывать показатели проекта в целом (все очереди),
+        chunk_size - количество проектов в одном блоке,
+        workers - количество процессов (None - по числу ядер, 1 - без пула),
+        in_flight - максимальное количество блоков в обработке (по умолчанию 2 на процесс)."""
+    paths = [output] + ([cash_flows] if cash_flows else [])
+    writers = [Writer(path) for path in paths]
+    chunks = read_chunks(source, chunk_size)
+    total = 0
+
+    def save(results):
+        for writer, frame in zip(writers, results):
+            writer.write(frame)
+
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                save(process_chunk(chunk, total, project, paths))
+                total += len(chunk)
+            return total
+        workers = workers or os.cpu_count() or 1
+        in_flight = in_flight or 2 * workers
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(process_chunk, chunk, total, project, paths))
+                total += len(chunk)
+                # Ожидание самого раннего блока сохраняет порядок строк и ограничивает память:
+                if len(pending) >= in_flight:
+                    save(pending.popleft().result())
+            while pending:
+                save(pending.popleft().result())
+        return total
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетный расчет NPV для портфеля проектов.')
+    parser.add_argument('source', help='входной файл CSV или Parquet (столбцы как в gui.parameters)')
+    parser.add_argument('output', help='файл для показателей проектов (CSV или Parquet)')
+    parser.add_argument('--cash-flows', help='файл для денежных потоков по кварталам (CSV или Parquet)')
+    parser.add_argument('--project', action='store_true',
+                        help='рассчитывать показатели проекта в целом (все очереди)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='количество проектов в блоке')
+    parser.add_argument('--workers', type=int, help='количество процессов (1 - без пула)')
+    parser.add_argument('--in-flight', type=int, help='максимальное количество блоков в обработке')
+    args = parser.parse_args()
+    total = run(args.source, args.output, args.cash_flows, args.project,
+                args.chunk_size, args.workers, args.in_flight)
+    print(f'Рассчитано проектов: {total}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Модуль для анализа чувствительности показателей проекта к исходным параметрам.
+Однофакторный анализ изменяет один параметр в заданном диапазоне при неизменных
+остальных и формирует данные для диаграммы "торнадо" (параметры упорядочены
+по размаху изменения NPV). Двухфакторный анализ рассчитывает NPV и IRR
+на сетке значений двух параметров и возвращает матрицы для тепловой карты.
+Ячейки сетки рассчитываются векторизованным движком блоками,
+которые распределяются по процессам пула.
+"""
+
+import numpy as np
+
+from NPV_calculator import default_parameters
+from batch import PARAMETER_KEYS, estimate_batch, map_parallel
+from timeline import estimate_timeline
+
+# Диапазоны параметров, соответствующие виджетам Scale в окне интерфейса
+# (в единицах модели: проценты пересчитаны в коэффициенты):
+SCALE_RANGES = {
+    'construction_costs': (50_000, 100_000),  # scale_construction_cost
+    'start_price': (80_000, 150_000),  # scale_start_price
+    'completion_premium': (1.1, 1.5),  # scale_completion_premium
+    'inflation_annual': (1.01, 1.2),  # scale_inflation
+    'discount_rate_annual': (1.03, 1.2),  # scale_discount_rate
+    'construction_period': (4, 20)  # scale_construction_period
+}
+
+# Параметры, принимающие только целые значения:
+INTEGER_KEYS = ('construction_period',)
+
+# Количество ячеек сетки в одном блоке расчета:
+CHUNK_SIZE = 10_000
+
+
+def evaluate_chunk(base: dict, columns: dict, project: bool) -> tuple:
+    """Функция рассчитывает NPV и IRR для блока сценариев, в которых
+    параметры из columns заменены массивами значений.
+    Аргументы:
+        base - базовый сценарий,
+        columns - словарь {параметр: массив значений},
+        project - рассчитывать показатели проекта в целом (все очереди)
+            вместо показателей одной очереди."""
+    pars = dict(base)
+    for key, values in columns.items():
+        pars[key] = np.rint(values) if key in INTEGER_KEYS else values
+    results = estimate_timeline(pars) if project else estimate_batch(pars, with_irr=True)
+    return results['NPV'], results['IRR']
+
+
+def evaluate(base: dict, columns: dict, project: bool = False,
+             workers: int = None, chunk_size: int = CHUNK_SIZE) -> tuple:
+    """Функция делит сценарии на блоки по chunk_size, рассчитывает их
+    в пуле процессов и возвращает массивы NPV и IRR."""
+    n = len(next(iter(columns.values())))
+    tasks = [(base, {key: values[start:start + chunk_size] for key, values in columns.items()}, project)
+             for start in range(0, n, chunk_size)]
+    results = map_parallel(evaluate_chunk, tasks, workers)
+    return (np.concatenate([result[0] for result in results]),
+            np.concatenate([result[1] for result in results]))
+
+
+def value_range(key: str, ranges: dict, steps: int) -> np.ndarray:
+    """Функция возвращает равномерную сетку значений параметра."""
+    low, high = ranges.get(key, SCALE_RANGES.get(key))
+    values = np.linspace(low, high, steps)
+    return np.unique(np.rint(values)) if key in INTEGER_KEYS else values
+
+
+def one_way(base: dict = None, ranges: dict = None, steps: int = 21, project: bool = False,
+            workers: int = None) -> dict:
+    """Функция выполняет однофакторный анализ чувствительности.
+    Аргументы:
+        base - базовый сценарий (по умолчанию default_parameters),
+        ranges - словарь {параметр: (минимум, максимум)}, по умолчанию SCALE_RANGES,
+        steps - количество значений каждого параметра,
+        project - анализировать показатели проекта в целом,
+        workers - количество процессов (None - по числу ядер, 1 - без пула).
+    Возвращает словарь {параметр: {'values': ..., 'NPV': ..., 'IRR': ...}}.
+    Все параметры рассчитываются одним векторизованным набором сценариев."""
+    base = dict(default_parameters if base is None else base)
+    ranges = SCALE_RANGES if ranges is None else ranges
+    grids = {key: value_range(key, ranges, steps) for key in ranges}
+    # Каждый сценарий отличается от базового значением одного параметра:
+    columns = {key: np.concatenate([values if key == varied else np.full(len(values), base[key], dtype=float)
+                                    for varied, values in grids.items()])
+               for key in grids}
+    npv, irr = evaluate(base, columns, project, workers)
+    results, start = {}, 0
+    for key, values in grids.items():
+        results[key] = {'values': values,
+                        'NPV': npv[start:start + len(values)],
+                        'IRR': irr[start:start + len(values)]}
+        start += len(values)
+    return results
+
+
+def tornado(base: dict = None, ranges: dict = None, project: bool = False, workers: int = 1) -> list:
+    """Функция формирует данные для диаграммы "торнадо": NPV при минимальном
+    и максимальном значении каждого параметра. Параметры упорядочены по убыванию
+    размаха изменения NPV относительно базового сценария."""
+    base = dict(default_parameters if base is None else base)
+    sweep = one_way(base, ranges, steps=2, project=project, workers=workers)
+    base_npv = evaluate(base, {key: np.array([base[key]], dtype=float) for key in PARAMETER_KEYS},
+                        project, workers=1)[0][0]
+    bars = []
+    for key, result in sweep.items():
+        npv_low, npv_high = result['NPV'][0], result['NPV'][-1]
+        bars.append({
+            'parameter': key,
+            'low': result['values'][0],
+            'high': result['values'][-1],
+            'NPV_low': npv_low,
+            'NPV_high': npv_high,
+            'delta_low': npv_low - base_npv,
+            'delta_high': npv_high - base_npv,
+            'swing': abs(npv_high - npv_low)
+        })
+    return sorted(bars, key=lambda bar: bar['swing'], reverse=True)
+
+
+def two_way(x_key: str, y_key: str, x_values: np.ndarray = None, y_values: np.ndarray = None,
+            steps: int = 200, base: dict = None, project: bool = False, workers: int = None,
+            chunk_size: int = CHUNK_SIZE) -> dict:
+    """Функция выполняет двухфакторный анализ чувствительности.
+    Аргументы:
+        x_key, y_key - названия параметров (ключи gui.parameters),
+        x_values, y_values - значения параметров (по умолчанию steps значений
+            в диапазонах SCALE_RANGES),
+        steps - количество значений по каждой оси,
+        base - базовый сценарий (по умолчанию default_parameters),
+        project - анализировать показатели проекта в целом,
+        workers - количество процессов (None - по числу ядер, 1 - без пула),
+        chunk_size - количество ячеек сетки в одном блоке.
+    Возвращает словарь со значениями осей x и y и матрицами NPV и IRR
+    размером (len(y), len(x)) для построения тепловой карты."""
+    base = dict(default_parameters if base is None else base)
+    x = value_range(x_key, {}, steps) if x_values is None else np.asarray(x_values, dtype=float)
+    y = value_range(y_key, {}, steps) if y_values is None else np.asarray(y_values, dtype=float)
+    grid_x, grid_y = np.meshgrid(x, y)
+    npv, irr = evaluate(base, {x_key: grid_x.ravel(), y_key: grid_y.ravel()}, project, workers, chunk_size)
+    return {'x_key': x_key, 'y_key': y_key, 'x': x, 'y': y,
+            'NPV': npv.reshape(grid_x.shape), 'IRR': irr.reshape(grid_x.shape)}
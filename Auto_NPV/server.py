@@ -0,0 +1,266 @@
+"""Локальный HTTP-сервис для расчета показателей проекта (JSON).
+Сервис постоянно работает в фоне, поэтому расчет не требует повторного
+импорта библиотек при каждом обращении. Запросы, поступившие в течение
+нескольких миллисекунд, объединяются в один пакет и рассчитываются
+векторизованным движком batch.estimate_batch в пуле процессов.
+Запросы:
+    POST /estimate - тело запроса: словарь параметров (ключи как в gui.parameters)
+        или список таких словарей; ответ: словарь (список словарей) с показателями
+        NPV, IRR, PBP, DPBP и кодом результата расчета IRR (см. irr.REASONS),
+    GET /health - проверка работоспособности сервиса.
+Запуск: python server.py [--host 127.0.0.1] [--port 8000] [--workers 2] [--window-ms 2]
+Пример запроса:
+    curl -d '{"floor_area": 10000, "apartment_area": 7000, "construction_costs": 60000,
+              "inflation_annual": 1.05, "construction_period": 10, "start_price": 105000,
+              "completion_premium": 1.3, "discount_rate_annual": 1.06}' http://127.0.0.1:8000/estimate
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+from batch import PARAMETER_KEYS, estimate_batch
+from NPV_calculator import default_parameters
+from sensitivity import SCALE_RANGES
+
+# Интервал накопления запросов в пакет, с, и максимальный размер пакета:
+BATCH_WINDOW = 0.002
+MAX_BATCH = 10_000
+
+# Максимальный размер тела запроса, байт:
+MAX_BODY = 16 * 1024 ** 2
+
+# Допустимый период строительства, кварталов (как на шкале окна интерфейса):
+PERIOD_RANGE = SCALE_RANGES['construction_period']
+
+# Параметры, которые должны быть положительными (площади, цены и коэффициенты):
+POSITIVE_KEYS = tuple(key for key in PARAMETER_KEYS if key != 'construction_period')
+
+# Показатели, возвращаемые в ответе:
+METRICS = ('NPV', 'IRR', 'PBP', 'DPBP', 'IRR_code')
+
+STATUSES = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def warm_up():
+    """Функция выполняется при запуске каждого процесса пула: импортирует
+    модули и заполняет кэши, чтобы первый запрос не ждал инициализации."""
+    estimate_batch(default_parameters, with_irr=True)
+
+
+def evaluate(columns: dict) -> list:
+    """Функция рассчитывает показатели для пакета сценариев.
+    Аргументы:
+        columns - словарь {параметр: список значений}.
+    Возвращает список словарей с показателями (NaN заменяется на None)."""
+    results = estimate_batch({key: np.asarray(values, dtype=np.float64) for key, values in columns.items()},
+                             with_irr=True)
+    table = [results[key].tolist() for key in METRICS]
+    return [{key: None if isinstance(value, float) and math.isnan(value) else value
+             for key, value in zip(METRICS, row)}
+            for row in zip(*table)]
+
+
+def validate(pars) -> dict:
+    """Функция проверяет параметры одного сценария и возвращает их в виде чисел.
+    Значения вне допустимых диапазонов модели отклоняются (ответ 400),
+    так как для них показатели не определены, а очень большой период
+    строительства приводит к расчетной таблице огромного размера."""
+    if not isinstance(pars, dict):
+        raise ValueError('Параметры сценария должны быть переданы словарем')
+    missing = [key for key in PARAMETER_KEYS if key not in pars]
+    if missing:
+        raise ValueError(f'Не заданы параметры: {", ".join(missing)}')
+    values = {}
+    for key in PARAMETER_KEYS:
+        value = pars[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'Параметр {key} должен быть числом')
+        values[key] = value
+    low, high = PERIOD_RANGE
+    period = values['construction_period']
+    if period != int(period) or not low <= period <= high:
+        raise ValueError(f'Период строительства должен быть целым числом от {low} до {high} кварталов')
+    for key in POSITIVE_KEYS:
+        if values[key] <= 0:
+            raise ValueError(f'Параметр {key} должен быть положительным')
+    return values
+
+
+class Batcher:
+
+    """Класс для объединения запросов в пакеты.
+    Аргументы:
+        pool - пул процессов для расчета,
+        window - интервал накопления запросов, с,
+        max_batch - максимальное количество сценариев в пакете."""
+
+    def __init__(self, pool, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []  # Сценарии, ожидающие расчета: (параметры, future)
+        self.timer = None
+
+    def submit(self, scenarios: list) -> list:
+        """Функция ставит сценарии в очередь и возвращает список future с результатами."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for pars in scenarios:
+            future = loop.create_future()
+            self.pending.append((pars, future))
+            futures.append(future)
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return futures
+
+    def flush(self):
+        """Функция передает накопленные сценарии на расчет одним или несколькими пакетами."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.pending:
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            asyncio.ensure_future(self.run(batch))
+
+    async def run(self, batch: list):
+        """Функция рассчитывает пакет в пуле процессов и передает результаты в future.
+        При ошибке расчета пакета сценарии рассчитываются по отдельности,
+        чтобы ошибка передавалась только в future сценария, который ее вызвал."""
+        columns = {key: [pars[key] for pars, _ in batch] for key in PARAMETER_KEYS}
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.pool, evaluate, columns)
+        except Exception as error:
+            if len(batch) > 1 and not isinstance(error, BrokenExecutor):
+                await asyncio.gather(*(self.run([item]) for item in batch))
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """Функция читает HTTP-запрос и возвращает (метод, путь, заголовки, тело)
+    или None, если клиент закрыл соединение."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY:
+        raise OverflowError
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def response(status: int, payload, keep_alive: bool) -> bytes:
+    """Функция формирует HTTP-ответ с телом в формате JSON."""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f'HTTP/1.1 {status} {STATUSES[status]}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + body
+
+
+async def dispatch(batcher: Batcher, method: str, path: str, body: bytes) -> tuple:
+    """Функция обрабатывает запрос и возвращает (код ответа, тело ответа)."""
+    path = path.split('?', 1)[0]
+    if path == '/health':
+        return 200, {'status': 'ok'}
+    if path != '/estimate':
+        return 404, {'error': f'Неизвестный адрес {path}'}
+    if method != 'POST':
+        return 405, {'error': 'Используйте метод POST'}
+    try:
+        payload = json.loads(body)
+        single = isinstance(payload, dict)
+        scenarios = [validate(pars) for pars in ([payload] if single else payload)]
+    except (ValueError, TypeError) as error:
+        return 400, {'error': str(error)}
+    try:
+        results = await asyncio.gather(*batcher.submit(scenarios))
+    except Exception as error:
+        return 500, {'error': str(error)}
+    return 200, results[0] if single else results
+
+
+async def handle(batcher: Batcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Функция обслуживает одно соединение (поддерживается keep-alive)."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except OverflowError:
+                writer.write(response(413, {'error': 'Слишком большой запрос'}, False))
+                break
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(response(400, {'error': 'Некорректный HTTP-запрос'}, False))
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            status, payload = await dispatch(batcher, method, path, body)
+            writer.write(response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, workers: int = None, window: float = BATCH_WINDOW,
+                max_batch: int = MAX_BATCH):
+    """Функция запускает сервис и обслуживает запросы до остановки."""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as pool:
+        # Запуск процессов пула до приема первого запроса:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, warm_up) for _ in range(workers)))
+        batcher = Batcher(pool, window, max_batch)
+        server = await asyncio.start_server(lambda reader, writer: handle(batcher, reader, writer), host, port)
+        print(f'Сервис запущен: http://{host}:{port}/estimate')
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP-сервис для расчета NPV.')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес сервиса')
+    parser.add_argument('--port', type=int, default=8000, help='порт сервиса')
+    parser.add_argument('--workers', type=int, help='количество процессов для расчета')
+    parser.add_argument('--window-ms', type=float, default=BATCH_WINDOW * 1000,
+                        help='интервал накопления запросов в пакет, мс')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help='максимальный размер пакета')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.window_ms / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
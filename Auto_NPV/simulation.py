@@ -0,0 +1,103 @@
+"""Модуль для оценки рисков проекта методом Монте-Карло.
+Параметры start_price, completion_premium, inflation_annual, construction_costs
+и construction_period разыгрываются из распределений, заданных пользователем,
+остальные параметры берутся из базового сценария. Для каждой траектории
+рассчитываются NPV и IRR векторизованным движком batch.estimate_batch.
+Траектории делятся на блоки фиксированного размера, которые обрабатываются
+в пуле процессов. Каждый блок получает собственный генератор случайных чисел,
+порожденный от общего зерна (numpy.random.SeedSequence), поэтому результат
+воспроизводится при одинаковом зерне независимо от количества процессов.
+"""
+
+import numpy as np
+
+from NPV_calculator import default_parameters
+from batch import PARAMETER_KEYS, estimate_batch, map_parallel
+
+# Параметры, которые могут разыгрываться случайным образом:
+SIMULATED_KEYS = ('start_price', 'completion_premium', 'inflation_annual',
+                  'construction_costs', 'construction_period')
+
+# Допустимый диапазон периода строительства в кварталах (как в окне интерфейса):
+CONSTRUCTION_PERIOD_RANGE = (4, 20)
+
+# Количество траекторий в одном блоке:
+SHARD_SIZE = 50_000
+
+# Перцентили распределений NPV и IRR, включаемые в результат:
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+def draw(rng: np.random.Generator, spec, size: int) -> np.ndarray:
+    """Функция возвращает выборку значений параметра.
+    Аргументы:
+        rng - генератор случайных чисел,
+        spec - число (параметр не разыгрывается) или кортеж из названия метода
+            numpy.random.Generator и его аргументов, например
+            ('normal', 105_000, 5_000), ('triangular', 8, 10, 14), ('uniform', 1.2, 1.4),
+        size - размер выборки."""
+    if np.isscalar(spec):
+        return np.full(size, spec, dtype=np.float64)
+    name, *args = spec
+    return np.asarray(getattr(rng, name)(*args, size=size), dtype=np.float64)
+
+
+def simulate_shard(distributions: dict, base: dict, size: int, seed: np.random.SeedSequence) -> tuple:
+    """Функция разыгрывает один блок траекторий и возвращает массивы NPV и IRR."""
+    rng = np.random.default_rng(seed)
+    pars = {key: np.full(size, base[key], dtype=np.float64) for key in PARAMETER_KEYS}
+    for key in SIMULATED_KEYS:
+        if key in distributions:
+            pars[key] = draw(rng, distributions[key], size)
+    # Период строительства - целое число кварталов:
+    pars['construction_period'] = np.clip(np.rint(pars['construction_period']),
+                                          *CONSTRUCTION_PERIOD_RANGE)
+    results = estimate_batch(pars, with_irr=True)
+    return results['NPV'], results['IRR']
+
+
+def summarize(values: np.ndarray) -> dict:
+    """Функция формирует сводную статистику распределения (без учета NaN)."""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return {'mean': np.nan, 'std': np.nan, 'share_defined': 0.0,
+                'percentiles': {p: np.nan for p in PERCENTILES}}
+    return {
+        'mean': float(finite.mean()),
+        'std': float(finite.std()),
+        'share_defined': len(finite) / len(values),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(finite, PERCENTILES).tolist()))
+    }
+
+
+def simulate(distributions: dict, base: dict = None, n_paths: int = 100_000, seed: int = 0,
+             workers: int = None, shard_size: int = SHARD_SIZE) -> dict:
+    """Функция выполняет моделирование методом Монте-Карло.
+    Аргументы:
+        distributions - словарь {параметр: спецификация распределения} для ключей
+            из SIMULATED_KEYS (формат спецификации описан в функции draw),
+        base - базовый сценарий для остальных параметров (по умолчанию default_parameters),
+        n_paths - количество траекторий,
+        seed - зерно генератора случайных чисел,
+        workers - количество процессов (None - по числу ядер, 1 - без пула),
+        shard_size - количество траекторий в одном блоке.
+    Возвращает словарь с массивами NPV и IRR (квартальная), сводной статистикой
+    по каждому показателю и вероятностью убытка (доля траекторий с NPV < 0)."""
+    unknown = set(distributions) - set(SIMULATED_KEYS)
+    if unknown:
+        raise ValueError(f'Параметры не поддерживаются для моделирования: {sorted(unknown)}')
+    base = dict(default_parameters if base is None else base)
+    sizes = [min(shard_size, n_paths - start) for start in range(0, n_paths, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    shards = map_parallel(simulate_shard,
+                          [(distributions, base, size, shard_seed) for size, shard_seed in zip(sizes, seeds)],
+                          workers)
+    npv = np.concatenate([shard[0] for shard in shards])
+    irr = np.concatenate([shard[1] for shard in shards])
+    return {
+        'NPV': npv,
+        'IRR': irr,
+        'NPV_summary': summarize(npv),
+        'IRR_summary': summarize(irr),
+        'loss_probability': float(np.mean(npv < 0))
+    }
@@ -0,0 +1,91 @@
+"""Модуль справочных таблиц для расчета графика продаж и индексов цен.
+Период продаж, нормированное распределение продаж по кварталам и индексы
+роста цен зависят только от небольшого набора дискретных параметров
+(ценовой сегмент, цена на старте продаж, период строительства, период продаж),
+поэтому результаты запоминаются в кэше ограниченного размера (LRU)
+и переиспользуются при повторных расчетах.
+Возвращаемые массивы доступны только для чтения, чтобы содержимое кэша
+нельзя было случайно изменить.
+Модуль scipy.special импортируется только при первом расчете распределения
+продаж, отсутствующего в кэше (scipy.stats не используется, так как его импорт
+занимает заметно больше времени).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Допущения для планирования темпов продаж:
+assumptions = {
+    'mass_market': {
+        'price_range': [80_000, 120_000],
+        'sales_period': [10, 14],  # Период реализации в кварталах
+        'max_phase_size': 55_000,  # Максимальная площадь квартир в одной очереди
+        'next_phase_share': 0.7  # Доля проданной площади очереди для вывода следующей очереди
+    },
+    'upper_class': {
+        'price_range': [120_000, 150_000],
+        'sales_period': [12, 16],
+        'max_phase_size': 40_000,
+        'next_phase_share': 0.7
+    }
+}
+
+# Шаг ценовой сетки, на которой интерполируется период продаж, руб./кв. м:
+PRICE_STEP = 1_000
+
+# Максимальное количество записей в каждом кэше:
+CACHE_SIZE = 1024
+
+
+def sales_periods(start_price: np.ndarray, segment: str) -> np.ndarray:
+    """Функция определяет период реализации квартир одной очереди (в кварталах)
+    для массива цен одного ценового сегмента. Период интерполируется линейно
+    между границами сегмента по позиции на ценовой сетке с шагом PRICE_STEP."""
+    min_price, max_price = assumptions[segment]['price_range']
+    min_quarters, max_quarters = assumptions[segment]['sales_period']
+    positions = (np.asarray(start_price, dtype=np.float64) - min_price) / PRICE_STEP
+    return np.ceil(np.interp(positions, [0, (max_price - min_price) / PRICE_STEP],
+                             [min_quarters, max_quarters]))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def sales_period(segment: str, start_price: float) -> int:
+    """Функция возвращает период реализации одной очереди для цены на старте продаж."""
+    return int(sales_periods(start_price, segment))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def sales_shares(peak_quarter: int, n_quarters: int) -> np.ndarray:
+    """Функция возвращает доли продаж по кварталам (в сумме 1).
+    Используется гамма-распределение с пиком продаж в квартале peak_quarter
+    на интервале между 1-м и 99-м процентилями распределения.
+    Квантили и плотность рассчитываются так же, как в scipy.stats.gamma."""
+    from scipy.special import gammaincinv, gammaln, xlogy
+    x = np.linspace(gammaincinv(peak_quarter, 0.01),
+                    gammaincinv(peak_quarter, 0.99), n_quarters)
+    y = np.exp(xlogy(peak_quarter - 1.0, x) - x - gammaln(peak_quarter))
+    shares = y / np.sum(y)
+    shares.setflags(write=False)
+    return shares
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def price_indexes(construction_period: int, completion_premium: float,
+                  inflation_quarterly: float, n_quarters: int) -> np.ndarray:
+    """Функция возвращает индексы роста цен по отношению к цене на старте продаж
+    для кварталов 1..n_quarters. До ввода дома цены растут равномерно до наценки
+    completion_premium, после ввода - в пределах инфляции."""
+    quarter = np.arange(1, n_quarters + 1)
+    quarterly_increase = completion_premium ** (1 / construction_period)
+    max_index = quarterly_increase ** construction_period
+    indexes = np.where(quarter <= construction_period, quarterly_increase ** quarter,
+                       max_index * inflation_quarterly ** (quarter - construction_period))
+    indexes.setflags(write=False)
+    return indexes
+
+
+def clear_caches():
+    """Функция очищает все кэши модуля."""
+    for function in (sales_period, sales_shares, price_indexes):
+        function.cache_clear()
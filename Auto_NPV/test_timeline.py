@@ -0,0 +1,28 @@
+"""Проверка суммирования денежных потоков очередей (модуль timeline)."""
+
+import numpy as np
+
+from NPV_calculator import default_parameters
+from timeline import combine_phase, combine_phases, estimate_timeline
+
+
+def test_combine_phases_mixed_phase_counts():
+    """Сценарии с разным количеством очередей и шагом запуска
+    суммируются так же, как каждый сценарий в отдельности."""
+    rng = np.random.default_rng(0)
+    cf = rng.normal(size=(4, 12))
+    n_phases = np.array([4, 1, 2, 1])
+    offset = np.array([3, 30, 7, 1])
+    combined = combine_phases(cf, n_phases, offset)
+    for row, count, step, project in zip(cf, n_phases, offset, combined):
+        expected = combine_phase(row, count, step)
+        np.testing.assert_allclose(project[:len(expected)], expected)
+        assert not project[len(expected):].any()
+
+
+def test_estimate_timeline_mixed_phase_counts():
+    pars = {key: [value, value] for key, value in default_parameters.items()}
+    pars.update(apartment_area=[200000, 7000], floor_area=[280000, 10000], construction_period=[4, 20])
+    results = estimate_timeline(pars)
+    assert list(results['n_phases']) == [4, 1]
+    assert np.isfinite(results['NPV']).all()
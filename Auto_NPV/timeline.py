@@ -0,0 +1,127 @@
+"""Модуль для расчета денежного потока жилого комплекса в целом с учетом очередей.
+Все очереди проекта одинаковы по площади и имеют одинаковый денежный поток
+(см. NPV_calculator.Estimation). Каждая следующая очередь выводится в продажу
+в квартале, следующем за тем, в котором в предыдущей очереди продана доля
+площади next_phase_share (см. tables.assumptions). Денежный поток проекта
+получается суммированием денежных потоков очередей, сдвинутых на шаг запуска,
+после чего дисконтируется от начала проекта. Суммирование выполняется
+без циклов по очередям: для одного сценария - сверткой потока очереди
+с последовательностью моментов запуска, для множества сценариев -
+накоплением по линейным индексам (np.bincount).
+"""
+
+import numpy as np
+
+from batch import CHUNK_SIZE, UPPER_CLASS_PRICE, as_batch, estimate_batch, payback_period
+from irr import solve_irr
+from tables import assumptions
+
+
+def launch_offset(sales_sq_m: np.ndarray, share: np.ndarray) -> np.ndarray:
+    """Функция возвращает шаг запуска очередей в кварталах: номер квартала,
+    в котором накопленные продажи очереди достигают доли share.
+    Аргументы:
+        sales_sq_m - продажи очереди по кварталам, массив (сценарии, кварталы),
+        share - доля проданной площади для каждого сценария."""
+    sales_sq_m = np.atleast_2d(sales_sq_m)
+    sold = np.cumsum(sales_sq_m, axis=1)
+    reached = sold >= np.asarray(share)[..., None] * sold[:, -1:] * (1 - 1e-12)
+    return reached.argmax(axis=1) + 1
+
+
+def next_phase_share(start_price: np.ndarray) -> np.ndarray:
+    """Функция возвращает долю проданной площади, при которой
+    выводится следующая очередь, для каждого сценария."""
+    return np.where(np.asarray(start_price) >= UPPER_CLASS_PRICE,
+                    assumptions['upper_class']['next_phase_share'],
+                    assumptions['mass_market']['next_phase_share'])
+
+
+def combine_phase(cf: np.ndarray, n_phases: int, offset: int) -> np.ndarray:
+    """Функция суммирует денежные потоки n_phases одинаковых очередей,
+    каждая из которых запускается через offset кварталов после предыдущей.
+    Сумма сдвинутых потоков равна свертке потока очереди с последовательностью
+    единичных импульсов в моменты запуска."""
+    launches = np.zeros((n_phases - 1) * offset + 1)
+    launches[::offset] = 1
+    return np.convolve(cf, launches)
+
+
+def combine_phases(cf: np.ndarray, n_phases: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    """Функция суммирует сдвинутые денежные потоки очередей для множества сценариев.
+    Аргументы:
+        cf - денежный поток одной очереди, массив (сценарии, кварталы),
+        n_phases - количество очередей для каждого сценария,
+        offset - шаг запуска очередей в кварталах для каждого сценария.
+    Возвращает массив (сценарии, кварталы проекта)."""
+    n, width = cf.shape
+    n_phases = n_phases.astype(np.intp)
+    offset = offset.astype(np.intp)
+    max_phases = int(n_phases.max(initial=1))
+    length = width + int(((n_phases - 1) * offset).max(initial=0))
+    phase = np.arange(max_phases)
+    # Квартал проекта для каждого квартала каждой очереди (сценарии, очереди, кварталы):
+    columns = (phase * offset[:, None])[:, :, None] + np.arange(width)
+    index = np.arange(n)[:, None, None] * length + columns
+    # Несуществующие очереди сценария исключаются: при большом шаге запуска
+    # их индексы выходят за продолжительность проекта (и за пределы строки):
+    exists = np.broadcast_to((phase < n_phases[:, None])[:, :, None], index.shape)
+    weights = np.broadcast_to(cf[:, None, :], index.shape)
+    return np.bincount(index[exists], weights=weights[exists], minlength=n * length).reshape(n, length)
+
+
+def project_metrics(cf: np.ndarray, discount_rate_annual: np.ndarray, with_irr: bool = True) -> dict:
+    """Функция рассчитывает показатели проекта в целом по его денежному потоку.
+    Аргументы:
+        cf - денежный поток проекта, массив (сценарии, кварталы),
+        discount_rate_annual - годовой коэффициент дисконтирования для каждого сценария,
+        with_irr - рассчитывать ли IRR."""
+    cf = np.atleast_2d(cf)
+    quarter = np.arange(1, cf.shape[1] + 1)
+    dcf = cf / (np.asarray(discount_rate_annual, dtype=np.float64) ** (1 / 4))[..., None] ** quarter
+    results = {
+        'CF': cf,
+        'DCF': dcf,
+        'NPV': np.trunc(dcf.sum(axis=1)),
+        'PBP': payback_period(cf),
+        'DPBP': payback_period(dcf)
+    }
+    if with_irr:
+        results['IRR'], results['IRR_code'] = solve_irr(cf)
+    return results
+
+
+def estimate_timeline(pars: dict, with_irr: bool = True, cash_flows: bool = False,
+                      chunk_size: int = CHUNK_SIZE) -> dict:
+    """Функция рассчитывает показатели проекта в целом (все очереди)
+    для множества сценариев.
+    Аргументы:
+        pars - словарь параметров (ключи как в gui.parameters) со скалярами или массивами,
+        with_irr - рассчитывать ли IRR проекта,
+        cash_flows - добавить в результат денежный поток проекта по кварталам (CF, DCF),
+        chunk_size - количество сценариев, обрабатываемых за один проход.
+    Возвращает словарь массивов: n_phases, launch_offset, NPV, PBP, DPBP
+    и при необходимости IRR, IRR_code, CF, DCF (денежные потоки дополнены нулями
+    до максимальной продолжительности проекта)."""
+    pars = as_batch(pars)
+    n = len(pars['construction_period'])
+    chunks = []
+    for start in range(0, max(n, 1), chunk_size):
+        chunk = {key: array[start:start + chunk_size] for key, array in pars.items()}
+        phase = estimate_batch(chunk, cash_flows=True, chunk_size=chunk_size)
+        offset = launch_offset(phase['sales_sq_m'], next_phase_share(chunk['start_price']))
+        cf = combine_phases(phase['CF'], phase['n_phases'], offset)
+        results = project_metrics(cf, chunk['discount_rate_annual'], with_irr)
+        results.update({'n_phases': phase['n_phases'], 'launch_offset': offset})
+        if not cash_flows:
+            del results['CF'], results['DCF']
+        chunks.append(results)
+    if len(chunks) == 1:
+        return chunks[0]
+    if cash_flows:
+        # Блоки могут иметь разную продолжительность - дополняем нулями:
+        length = max(chunk['CF'].shape[1] for chunk in chunks)
+        for chunk in chunks:
+            for key in ('CF', 'DCF'):
+                chunk[key] = np.pad(chunk[key], ((0, 0), (0, length - chunk[key].shape[1])))
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
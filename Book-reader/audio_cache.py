@@ -0,0 +1,157 @@
+"""Модуль для хранения озвученных страниц на диске.
+Аудио фрагмента страницы идентифицируется ключом - хэшем SHA-256 от отпечатка
+документа (см. memory.quick_fingerprint), номера страницы, номера и хэша текста
+фрагмента, голоса, скорости речи и движка синтеза, поэтому при повторном открытии книги,
+возврате к прослушанным страницам и при переименовании файла страница
+не озвучивается заново.
+Аудио хранится в сжатом виде в формате FLAC (пакет soundfile); файл .wav,
+сжатый zlib, используется, только если формат аудио не поддерживается
+библиотекой libsndfile. Суммарный размер кэша ограничен:
+при превышении удаляются записи, к которым дольше всего не обращались.
+Суммарный размер отслеживается при записи, папка кэша просматривается
+только при превышении ограничения.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zlib
+
+import soundfile
+
+# Версия формата записей (увеличивается при изменении способа озвучивания):
+CACHE_VERSION = 2
+
+# Папка кэша и ограничение его размера по умолчанию:
+CACHE_DIRECTORY = 'reader_audio_cache'
+MAX_BYTES = 512 * 1024 ** 2
+
+# Доля max_bytes, до которой уменьшается кэш при вытеснении
+# (чтобы вытеснение не выполнялось при каждой следующей записи):
+LOW_WATER = 0.9
+
+# Расширения файлов записей:
+FLAC = '.flac'
+WAVZ = '.wavz'
+
+
+def encode(audio: bytes) -> tuple:
+    """Функция сжимает аудио .wav и возвращает (расширение, данные)."""
+    try:
+        data, rate = soundfile.read(io.BytesIO(audio), dtype='int16')
+        output = io.BytesIO()
+        soundfile.write(output, data, rate, format='FLAC')
+    except RuntimeError:  # Формат аудио не поддерживается libsndfile
+        return WAVZ, zlib.compress(audio)
+    return FLAC, output.getvalue()
+
+
+def decode(extension: str, data: bytes) -> bytes:
+    """Функция восстанавливает аудио .wav из сжатых данных."""
+    if extension == WAVZ:
+        return zlib.decompress(data)
+    samples, rate = soundfile.read(io.BytesIO(data), dtype='int16')
+    output = io.BytesIO()
+    soundfile.write(output, samples, rate, format='WAV', subtype='PCM_16')
+    return output.getvalue()
+
+
+class AudioCache:
+
+    """Класс для хранения аудио страниц на диске.
+    Аргументы:
+        directory - папка кэша,
+        max_bytes - максимальный суммарный размер записей, байт."""
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.disk_bytes = sum(size for _, size, _ in self.files())  # Суммарный размер записей
+
+    @staticmethod
+    def key(document: str, page: int, chunk: int, text: str, voice: str, rate: int, engine: str) -> str:
+        """Функция возвращает ключ записи.
+        Аргументы:
+            document - отпечаток документа (см. memory.quick_fingerprint),
+            page, chunk - номер страницы и номер фрагмента на ней,
+            text - текст фрагмента,
+            voice, rate, engine - голос, скорость речи и движок синтеза."""
+        text_digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        canonical = json.dumps([CACHE_VERSION, document, page, chunk, text_digest, voice, rate, engine])
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key: str):
+        """Функция возвращает аудио .wav из кэша или None, если записи нет.
+        Время доступа к файлу обновляется, чтобы при вытеснении
+        учитывался порядок обращений."""
+        for extension in (FLAC, WAVZ):
+            path = self.path(key, extension)
+            try:
+                with open(path, 'rb') as file:
+                    audio = decode(extension, file.read())
+            except (OSError, RuntimeError, zlib.error):
+                continue
+            os.utime(path)
+            return audio
+        return None
+
+    def put(self, key: str, audio: bytes):
+        """Функция сохраняет аудио .wav в кэш (через временный файл,
+        чтобы другие экземпляры программы не читали недописанные файлы)."""
+        extension, data = encode(audio)
+        path = self.path(key, extension)
+        size = len(data)
+        try:
+            size -= os.path.getsize(path)  # Запись заменяет прежнюю
+        except OSError:
+            pass
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+        self.disk_bytes += size
+        if self.disk_bytes > self.max_bytes:
+            self.evict()
+
+    def files(self) -> list:
+        """Функция возвращает записи кэша: список (время доступа, размер, путь)."""
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith((FLAC, WAVZ)):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # Запись удалена другим экземпляром программы
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self):
+        """Функция удаляет записи, к которым дольше всего не обращались,
+        пока суммарный размер превышает LOW_WATER * max_bytes. Размер
+        пересчитывается по папке, так как в нее могут писать другие
+        экземпляры программы."""
+        files = self.files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= LOW_WATER * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+    def clear(self):
+        """Функция удаляет все записи кэша."""
+        for name in os.listdir(self.directory):
+            if name.endswith((FLAC, WAVZ)):
+                os.remove(os.path.join(self.directory, name))
+        self.disk_bytes = 0
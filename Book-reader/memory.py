@@ -0,0 +1,133 @@
+"""Модуль для хранения памяти ридера в базе данных SQLite.
+База содержит позицию чтения (страница и фрагмент на ней) для каждой книги
+и индексы страниц файлов .txt (см. модуль pages). Книга определяется
+по отпечатку содержимого файла, а не по пути к нему, поэтому позиция
+сохраняется при перемещении и переименовании файла. Позиция записывается
+в ходе чтения отдельными транзакциями (журнал WAL), поэтому аварийное
+завершение программы не повреждает память ридера.
+При первом запуске записи прежнего файла reader_memory.json переносятся
+в базу, а сам файл переименовывается в reader_memory.json.bak.
+Индексы страниц привязаны к отпечатку книги и удаляются вместе
+с ее позицией, когда книга прослушана до конца.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Файл базы данных и файл памяти прежних версий:
+MEMORY_PATH = 'reader_memory.db'
+LEGACY_PATH = 'reader_memory.json'
+
+# Объем начала и конца файла, по которым рассчитывается отпечаток, байт:
+FINGERPRINT_BLOCK = 64 * 1024
+
+# Версия схемы базы данных:
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS books (
+    fingerprint TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    chunk INTEGER NOT NULL,
+    n_pages INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_indexes (
+    key TEXT PRIMARY KEY,
+    book TEXT NOT NULL,
+    offsets BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_indexes_book ON page_indexes (book);
+'''
+
+
+def quick_fingerprint(path: str) -> str:
+    """Функция возвращает отпечаток содержимого файла: хэш SHA-256 от размера
+    файла, его начала и конца. Время расчета не зависит от объема файла."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        digest.update(str(size).encode('ascii'))
+        digest.update(file.read(FINGERPRINT_BLOCK))
+        if size > 2 * FINGERPRINT_BLOCK:
+            file.seek(-FINGERPRINT_BLOCK, os.SEEK_END)
+        digest.update(file.read(FINGERPRINT_BLOCK))
+    return digest.hexdigest()
+
+
+class ReaderMemory:
+
+    """Класс для доступа к памяти ридера.
+    Аргументы:
+        path - путь к файлу базы данных,
+        legacy_path - путь к файлу памяти прежних версий (None - без переноса)."""
+
+    def __init__(self, path: str = MEMORY_PATH, legacy_path: str = LEGACY_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        if legacy_path is not None and os.path.exists(legacy_path):
+            self.migrate(legacy_path)
+
+    def migrate(self, legacy_path: str):
+        """Функция переносит позиции чтения из файла reader_memory.json
+        (записи для файлов, которых больше нет, пропускаются)."""
+        try:
+            with open(legacy_path, 'r') as file:
+                legacy = json.load(file)
+        except (OSError, ValueError):
+            return
+        with self.connection:
+            for path, saved in legacy.items():
+                page, chunk = saved if isinstance(saved, list) else (saved, 0)
+                try:
+                    book = quick_fingerprint(path)
+                except OSError:
+                    continue
+                self.connection.execute(
+                    'INSERT OR IGNORE INTO books VALUES (?, ?, ?, ?, ?, ?)',
+                    (book, path, page, chunk, 0, time.time()))
+        os.replace(legacy_path, legacy_path + '.bak')
+
+    def position(self, book: str):
+        """Функция возвращает сохраненную позицию (страница, фрагмент) или None."""
+        row = self.connection.execute('SELECT page, chunk FROM books WHERE fingerprint = ?', (book,)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def save_position(self, book: str, path: str, page: int, chunk: int, n_pages: int):
+        """Функция сохраняет текущую позицию чтения книги."""
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO books VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(fingerprint) DO UPDATE SET path = excluded.path, page = excluded.page, '
+                'chunk = excluded.chunk, n_pages = excluded.n_pages, updated = excluded.updated',
+                (book, path, page, chunk, n_pages, time.time()))
+
+    def forget(self, book: str):
+        """Функция удаляет позицию чтения и индексы страниц книги
+        (книга прослушана до конца)."""
+        with self.connection:
+            self.connection.execute('DELETE FROM books WHERE fingerprint = ?', (book,))
+            self.connection.execute('DELETE FROM page_indexes WHERE book = ?', (book,))
+
+    def read_index(self, key: str):
+        """Функция возвращает сохраненный индекс страниц (bytes) или None."""
+        row = self.connection.execute('SELECT offsets FROM page_indexes WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def write_index(self, key: str, offsets: bytes, book: str):
+        """Функция сохраняет индекс страниц книги с отпечатком book."""
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO page_indexes VALUES (?, ?, ?, ?)',
+                                    (key, book, offsets, time.time()))
+
+    def close(self):
+        self.connection.close()
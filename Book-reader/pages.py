@@ -0,0 +1,219 @@
+"""Модуль для постраничного извлечения текста из файлов.
+Текст страницы извлекается только при обращении к ней, поэтому открытие
+документа и переход к сохраненной странице не зависят от объема документа.
+Извлеченные страницы хранятся в небольшом кэше (LRU), несколько следующих
+страниц извлекаются заранее в фоновом потоке.
+Файл .txt отображается в память (mmap) и делится на страницы примерно
+по TXT_PAGE_SIZE знаков с разрывом на границе предложения. Индекс страниц
+(позиции начала страниц в байтах) строится за один проход по файлу
+и сохраняется в памяти ридера (см. модуль memory), поэтому при повторном открытии
+даже очень большой файл открывается сразу, а для чтения страницы
+считывается только ее диапазон байтов. Текст декодируется в кодировке
+по умолчанию (как при открытии файла функцией open).
+"""
+
+import hashlib
+import json
+import locale
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+import fitz
+
+from memory import quick_fingerprint
+
+# Количество страниц в кэше и количество страниц, извлекаемых заранее:
+PAGE_CACHE_SIZE = 8
+READ_AHEAD = 3
+
+# Объем страницы файла .txt в знаках (примерно одна страница pdf):
+TXT_PAGE_SIZE = 4000
+
+# Версия формата индекса страниц файлов .txt
+# (увеличивается при изменении правил деления на страницы):
+INDEX_VERSION = 1
+
+# Границы предложений и слов в байтах (для кодировок, совместимых с ASCII):
+SENTENCE_BREAK = re.compile(rb'[.!?]["\')\]]*\s+')
+WORD_BREAK = re.compile(rb'\s+')
+
+# Форматы, которые открываются библиотекой fitz:
+DOCUMENT_EXTENSIONS = ('.pdf', '.xps', '.oxps', '.epub', '.cbz', '.fb2')
+
+
+def last_break(pattern, data, start: int, end: int):
+    """Функция возвращает позицию после последнего совпадения с pattern
+    в диапазоне байтов [start, end) или None, если совпадений нет."""
+    position = None
+    for match in pattern.finditer(data, start, end):
+        position = match.end()
+    return position
+
+
+def build_offsets(data, encoding: str, page_size: int = TXT_PAGE_SIZE) -> array:
+    """Функция делит текст на страницы и возвращает позиции начала страниц
+    в байтах (последний элемент - размер текста). Страница содержит
+    не более page_size знаков и заканчивается на границе предложения
+    (при ее отсутствии во второй половине страницы - на границе слова)."""
+    offsets = array('Q', [0])
+    size = len(data)
+    start = 0
+    while start < size:
+        # Окно в 4 раза больше страницы вмещает page_size знаков в любой кодировке:
+        window = data[start:start + 4 * page_size]
+        text = window.decode(encoding, 'surrogateescape')
+        if len(text) <= page_size and start + len(window) == size:
+            end = size
+        else:
+            end = start + len(text[:page_size].encode(encoding, 'surrogateescape'))
+            middle = start + (end - start) // 2
+            end = (last_break(SENTENCE_BREAK, data, middle, end)
+                   or last_break(WORD_BREAK, data, middle, end) or end)
+        offsets.append(end)
+        start = end
+    return offsets
+
+
+class TextPages:
+
+    """Класс для чтения страниц файла .txt, отображенного в память.
+    Аргументы:
+        path - путь к файлу,
+        index_store - хранилище индексов страниц с методами read_index(key)
+            и write_index(key, offsets, book), например memory.ReaderMemory
+            (None - индекс не сохраняется),
+        book - отпечаток содержимого файла (None - рассчитывается
+            функцией memory.quick_fingerprint).
+    Индекс идентифицируется отпечатком содержимого, а не путем к файлу,
+    поэтому сохраняется при перемещении и переименовании файла."""
+
+    def __init__(self, path: str, index_store=None, book: str = None):
+        self.encoding = locale.getpreferredencoding(False)
+        self.file = open(path, 'rb')
+        stat = os.fstat(self.file.fileno())
+        # Пустой файл не может быть отображен в память:
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+        self.book = quick_fingerprint(path) if book is None else book
+        key = json.dumps([INDEX_VERSION, self.book, self.encoding, TXT_PAGE_SIZE])
+        self.index_store = index_store
+        self.index_key = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        self.offsets = self.read_index()
+        if self.offsets is None:
+            self.offsets = build_offsets(self.data, self.encoding)
+            self.write_index()
+
+    def read_index(self):
+        """Функция читает сохраненный индекс страниц или возвращает None."""
+        if self.index_store is None:
+            return None
+        data = self.index_store.read_index(self.index_key)
+        offsets = array('Q')
+        try:
+            offsets.frombytes(data or b'')
+        except ValueError:
+            return None
+        if not offsets or offsets[-1] != len(self.data):
+            return None
+        return offsets
+
+    def write_index(self):
+        """Функция сохраняет индекс страниц в хранилище."""
+        if self.index_store is not None:
+            self.index_store.write_index(self.index_key, self.offsets.tobytes(), self.book)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def extract(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode(self.encoding, errors='replace')
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+class DocumentPages:
+
+    """Класс для извлечения страниц документов .pdf, .epub и др. средствами fitz."""
+
+    def __init__(self, path: str):
+        self.doc = fitz.open(path)
+
+    def __len__(self) -> int:
+        return self.doc.pageCount
+
+    def extract(self, index: int) -> str:
+        return self.doc.loadPage(index).getText('text')
+
+    def close(self):
+        self.doc.close()
+
+
+class PageSource:
+
+    """Класс для доступа к тексту страниц документа по индексу.
+    Аргументы:
+        path - путь к файлу,
+        cache_size - количество страниц в кэше,
+        read_ahead - количество следующих страниц, извлекаемых заранее,
+        index_store - хранилище индексов страниц файлов .txt (см. TextPages),
+        book - отпечаток содержимого файла (см. TextPages)."""
+
+    def __init__(self, path: str, cache_size: int = PAGE_CACHE_SIZE, read_ahead: int = READ_AHEAD,
+                 index_store=None, book: str = None):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.txt':
+            self.pages = TextPages(path, index_store, book)
+        elif extension in DOCUMENT_EXTENSIONS:
+            self.pages = DocumentPages(path)
+        else:
+            raise ValueError(f'Формат {extension} не поддерживается')
+        self.cache_size = max(cache_size, read_ahead + 1)
+        self.read_ahead = read_ahead
+        self.cache = OrderedDict()
+        # Документ не допускает одновременного обращения из нескольких потоков:
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __getitem__(self, index: int) -> str:
+        """Функция возвращает текст страницы и запускает
+        извлечение следующих страниц в фоновом потоке."""
+        text = self.load(index)
+        self.prefetch(index)
+        return text
+
+    def load(self, index: int) -> str:
+        """Функция возвращает текст страницы из кэша или из документа."""
+        with self.lock:
+            if index in self.cache:
+                self.cache.move_to_end(index)
+                return self.cache[index]
+            text = self.pages.extract(index)
+            self.cache[index] = text
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return text
+
+    def prefetch(self, index: int):
+        """Функция извлекает в фоновом потоке страницы, следующие за index."""
+        upcoming = [page for page in range(index + 1, min(index + 1 + self.read_ahead, len(self)))
+                    if page not in self.cache]
+        if not upcoming or (self.worker is not None and self.worker.is_alive()):
+            return
+        self.worker = threading.Thread(target=lambda: [self.load(page) for page in upcoming], daemon=True)
+        self.worker.start()
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.join()
+        with self.lock:
+            self.pages.close()
+            self.cache.clear()
@@ -0,0 +1,125 @@
+"""Модуль для озвучивания подсказок интерфейса в отдельном потоке.
+Объект pyttsx3 создается и используется только потоком озвучивания
+(объекты pyttsx3 не допускают обращения из нескольких потоков), поэтому
+озвучивание подсказок не блокирует обработку событий окна.
+Подсказки выбираются из очереди по приоритету (при равном приоритете -
+в порядке поступления). Срочная подсказка прерывает текущую и отменяет
+ожидающие. Цикл pyttsx3 работает во внешнем режиме (startLoop(False)
+и iterate()), поэтому озвучивание можно прервать методом stop().
+Пример:
+    speaker = Speaker(on_start=duck, on_end=restore)
+    speaker.say('Выберите текстовый файл.')
+    speaker.say('Перехожу к странице 5', interrupt=True)
+    speaker.close()
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+# Приоритеты подсказок (меньшее значение озвучивается раньше):
+URGENT = 0
+NORMAL = 1
+
+# Интервал обработки событий pyttsx3 во время озвучивания, с:
+ITERATE_INTERVAL = 0.02
+
+
+class Speaker:
+
+    """Класс для озвучивания подсказок в отдельном потоке.
+    Аргументы:
+        on_start - функция, вызываемая (в потоке озвучивания) перед началом подсказки,
+        on_end - функция, вызываемая после окончания или прерывания подсказки."""
+
+    def __init__(self, on_start=None, on_end=None):
+        self.on_start = on_start
+        self.on_end = on_end
+        self.lock = threading.Condition()
+        self.queue = []  # Очередь подсказок: (приоритет, порядковый номер, текст)
+        self.order = itertools.count()
+        self.speaking = False
+        self.interrupted = False
+        self.closed = False
+        self.worker = threading.Thread(target=self.run, name='speech', daemon=True)
+        self.worker.start()
+
+    def say(self, text: str, priority: int = NORMAL, interrupt: bool = False):
+        """Функция ставит подсказку в очередь и сразу возвращает управление.
+        Аргументы:
+            text - текст подсказки,
+            priority - приоритет подсказки (URGENT, NORMAL),
+            interrupt - прервать текущую подсказку и отменить ожидающие."""
+        with self.lock:
+            if interrupt:
+                self.queue.clear()
+                self.interrupted = self.speaking
+            heapq.heappush(self.queue, (priority, next(self.order), text))
+            self.lock.notify_all()
+
+    def cancel(self):
+        """Функция прерывает текущую подсказку и отменяет ожидающие."""
+        with self.lock:
+            self.queue.clear()
+            self.interrupted = self.speaking
+            self.lock.notify_all()
+
+    def busy(self) -> bool:
+        with self.lock:
+            return self.speaking or bool(self.queue)
+
+    def wait(self):
+        """Функция ожидает окончания озвучивания всех подсказок."""
+        with self.lock:
+            while (self.speaking or self.queue) and self.worker.is_alive():
+                self.lock.wait(0.1)
+
+    def run(self):
+        """Функция потока озвучивания."""
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.startLoop(False)
+        try:
+            while True:
+                with self.lock:
+                    if self.interrupted:
+                        engine.stop()
+                        self.interrupted = False
+                    if not self.speaking:
+                        while not self.queue and not self.closed:
+                            self.lock.wait()
+                        if not self.queue:
+                            return
+                        _, _, text = heapq.heappop(self.queue)
+                        self.speaking = True
+                        start = True
+                    else:
+                        start = False
+                if start:
+                    if self.on_start is not None:
+                        self.on_start()
+                    engine.say(text)
+                engine.iterate()
+                if not engine.isBusy():
+                    with self.lock:
+                        self.speaking = False
+                        self.lock.notify_all()
+                    if self.on_end is not None:
+                        self.on_end()
+                else:
+                    time.sleep(ITERATE_INTERVAL)
+        finally:
+            engine.endLoop()
+            with self.lock:
+                self.speaking = False
+                self.lock.notify_all()
+
+    def close(self):
+        """Функция прерывает озвучивание и останавливает поток."""
+        with self.lock:
+            self.queue.clear()
+            self.interrupted = self.speaking
+            self.closed = True
+            self.lock.notify_all()
+        self.worker.join()
@@ -0,0 +1,268 @@
+"""Модуль для заблаговременного преобразования страниц текста в аудио.
+Преобразование выполняется в отдельном процессе, который владеет собственным
+объектом pyttsx3 и не мешает озвучиванию подсказок в основном процессе.
+Текст страницы делится на фрагменты размером в одно или несколько
+предложений (длинные предложения - по знакам препинания внутри них),
+которые озвучиваются по очереди, поэтому воспроизведение начинается после
+озвучивания первого фрагмента, а не всей страницы. Позиция плейера
+определяется номером страницы и номером фрагмента на ней.
+Пока воспроизводится текущий фрагмент, процесс озвучивает следующие
+фрагменты текущей страницы и несколько следующих страниц, поэтому переход
+к следующей странице и к ближайшим страницам выполняется без паузы.
+Аудио передается основному процессу в памяти (содержимое файла .wav
+в виде bytes) и воспроизводится через pygame.mixer.Sound, поэтому
+плейер не использует общих файлов в текущей директории. Библиотека pyttsx3
+умеет сохранять аудио только в файл, поэтому процесс преобразования
+записывает фрагмент во временный файл с уникальным именем, считывает
+его и сразу удаляет.
+Озвученные фрагменты сохраняются в кэше на диске (см. модуль audio_cache),
+поэтому при повторном обращении к странице она не озвучивается заново.
+Процесс запускается командой python synthesis.py. Запросы передаются
+строками JSON через stdin, ответ - строка JSON с размером аудио в байтах,
+за которой в stdout следует само аудио.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, deque
+
+from audio_cache import CACHE_DIRECTORY, AudioCache
+
+# Количество страниц, озвучиваемых заранее (после текущей):
+READ_AHEAD = 2
+
+# Максимальная длина фрагмента текста, знаков:
+CHUNK_SIZE = 300
+
+# Границы предложений (знак конца предложения и пробел или пустая строка)
+# и границы частей предложения:
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n\s*\n')
+CLAUSE_END = re.compile(r'(?<=[,;:])\s+|\s+(?=[—–-]\s)')
+
+
+def split_long(sentence: str, size: int) -> list:
+    """Функция делит предложение длиннее size знаков на части
+    по знакам препинания, а при их отсутствии - по пробелам."""
+    parts = []
+    for clause in CLAUSE_END.split(sentence):
+        while len(clause) > size:
+            cut = clause.rfind(' ', 0, size)
+            cut = cut if cut > 0 else size
+            parts.append(clause[:cut])
+            clause = clause[cut:].lstrip()
+        parts.append(clause)
+    return parts
+
+
+def split_chunks(text: str, size: int = CHUNK_SIZE) -> list:
+    """Функция делит текст страницы на фрагменты не длиннее size знаков
+    по границам предложений. Первый фрагмент состоит из одного предложения,
+    чтобы воспроизведение начиналось как можно быстрее, следующие короткие
+    предложения объединяются. Страница без текста состоит из одного фрагмента."""
+    chunks = []
+    current = ''
+    for sentence in SENTENCE_END.split(text):
+        sentence = ' '.join(sentence.split())
+        if not sentence:
+            continue
+        for part in split_long(sentence, size) if len(sentence) > size else [sentence]:
+            if current and (not chunks or len(current) + 1 + len(part) > size):
+                chunks.append(current)
+                current = ''
+            current = f'{current} {part}' if current else part
+    if current:
+        chunks.append(current)
+    return chunks or [text]
+
+
+class Synthesizer:
+
+    """Класс для управления процессом преобразования текста в аудио.
+    Аргументы:
+        pages - страницы текста (объект pages.PageSource или список строк),
+        document - отпечаток документа для кэша (см. memory.quick_fingerprint;
+            None - аудио не кэшируется),
+        cache_directory - папка кэша аудио,
+        read_ahead - количество страниц, озвучиваемых заранее,
+        on_ready - функция, вызываемая (в фоновом потоке) с позицией
+            (страница, фрагмент), аудио которой готово."""
+
+    def __init__(self, pages, document: str = None, cache_directory: str = CACHE_DIRECTORY,
+                 read_ahead: int = READ_AHEAD, on_ready=None):
+        self.pages = pages
+        self.document = document
+        self.read_ahead = read_ahead
+        self.on_ready = on_ready
+        self.lock = threading.Condition()
+        self.split = OrderedDict()  # Фрагменты последних страниц: {номер страницы: список строк}
+        self.window = set()  # Позиции, которые должны быть озвучены
+        self.queue = deque()  # Позиции, ожидающие передачи процессу
+        self.in_flight = None  # Позиция, которую озвучивает процесс
+        self.ready = {}  # Готовые фрагменты: {(страница, фрагмент): аудио .wav}
+        self.errors = {}  # Ошибки преобразования: {(страница, фрагмент): сообщение}
+        self.closed = False
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), cache_directory],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.reader = threading.Thread(target=self.read_results, name='synthesis', daemon=True)
+        self.reader.start()
+
+    def chunks(self, page: int) -> list:
+        """Функция возвращает фрагменты текста страницы."""
+        with self.lock:
+            if page not in self.split:
+                self.split[page] = split_chunks(self.pages[page])
+                while len(self.split) > self.read_ahead + 2:
+                    self.split.popitem(last=False)
+            self.split.move_to_end(page)
+            return self.split[page]
+
+    def next_position(self, page: int, chunk: int):
+        """Функция возвращает позицию, следующую за (page, chunk),
+        или None, если это последний фрагмент документа."""
+        if chunk + 1 < len(self.chunks(page)):
+            return page, chunk + 1
+        if page + 1 < len(self.pages):
+            return page + 1, 0
+        return None
+
+    def schedule(self, page: int, chunk: int = 0):
+        """Функция сообщает текущую позицию: озвучиваются фрагменты, начиная
+        с (page, chunk), до конца страницы и следующие read_ahead страниц,
+        аудио остальных фрагментов больше не требуется."""
+        with self.lock:
+            positions = [(page, index) for index in range(chunk, len(self.chunks(page)))]
+            for following in range(page + 1, min(page + self.read_ahead + 1, len(self.pages))):
+                positions += [(following, index) for index in range(len(self.chunks(following)))]
+            self.window = set(positions)
+            self.ready = {key: audio for key, audio in self.ready.items() if key in self.window}
+            self.errors.clear()
+            self.queue = deque(key for key in positions if key not in self.ready and key != self.in_flight)
+            self.dispatch()
+
+    def dispatch(self):
+        """Функция передает процессу следующий фрагмент из очереди
+        (процесс озвучивает фрагменты по одному, чтобы очередь можно было
+        изменить при переходе к другой странице). Вызывается под self.lock."""
+        if self.in_flight is not None or not self.queue or self.closed:
+            return
+        page, chunk = self.in_flight = self.queue.popleft()
+        request = {'page': page, 'chunk': chunk, 'text': self.chunks(page)[chunk], 'document': self.document}
+        try:
+            self.process.stdin.write(json.dumps(request).encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+        except OSError:
+            self.closed = True
+            self.lock.notify_all()
+
+    def read_results(self):
+        """Функция фонового потока: принимает результаты от процесса."""
+        for line in self.process.stdout:
+            result = json.loads(line)
+            position = result['page'], result['chunk']
+            audio = self.process.stdout.read(result.get('size', 0))
+            with self.lock:
+                self.in_flight = None
+                if position in self.window:
+                    if 'error' in result:
+                        self.errors[position] = result['error']
+                    else:
+                        self.ready[position] = audio
+                self.dispatch()
+                self.lock.notify_all()
+                done = position in self.ready
+            if done and self.on_ready is not None:
+                self.on_ready(position)
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+
+    def audio(self, page: int, chunk: int = 0):
+        """Функция возвращает аудио фрагмента или None, если аудио не готово."""
+        with self.lock:
+            return self.ready.get((page, chunk))
+
+    def wait(self, page: int, chunk: int = 0) -> bytes:
+        """Функция ожидает преобразования фрагмента и возвращает его аудио.
+        Если фрагмент не входит в число озвучиваемых, он становится текущим."""
+        position = page, chunk
+        with self.lock:
+            if position not in self.window:
+                self.schedule(page, chunk)
+            while position not in self.ready:
+                if position in self.errors:
+                    raise RuntimeError(f'Ошибка преобразования страницы {page + 1}: {self.errors[position]}')
+                if self.closed:
+                    raise RuntimeError('Процесс преобразования текста в аудио завершен')
+                self.lock.wait()
+            return self.ready[position]
+
+    def close(self):
+        """Функция завершает процесс преобразования."""
+        with self.lock:
+            self.closed = True
+            self.queue.clear()
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.reader.join()
+
+
+def synthesize(engine, text: str) -> bytes:
+    """Функция преобразует текст в аудио .wav и возвращает его содержимое."""
+    descriptor, path = tempfile.mkstemp(suffix='.wav')
+    os.close(descriptor)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with open(path, 'rb') as file:
+            return file.read()
+    finally:
+        os.remove(path)
+
+
+def serve(cache_directory: str = CACHE_DIRECTORY):
+    """Функция процесса преобразования: озвучивает фрагменты по запросам из stdin
+    и передает аудио в stdout. Аудио берется из кэша, если фрагмент уже был
+    озвучен тем же голосом с той же скоростью речи. Документ определяется
+    отпечатком из запроса, поэтому файл документа процессом не читается."""
+    import pyttsx3
+    engine = pyttsx3.init()
+    cache = AudioCache(cache_directory)
+    settings = {'voice': engine.getProperty('voice'), 'rate': engine.getProperty('rate'),
+                'engine': f'pyttsx3 {sys.platform}'}
+    output = sys.stdout.buffer
+    for line in sys.stdin.buffer:
+        request = json.loads(line)
+        result = {'page': request['page'], 'chunk': request['chunk']}
+        audio, key = None, None
+        try:
+            if request.get('document'):
+                key = cache.key(request['document'], request['page'], request['chunk'],
+                                request['text'], **settings)
+                audio = cache.get(key)
+            if audio is None:
+                audio = synthesize(engine, request['text'])
+            else:
+                key = None
+            result['size'] = len(audio)
+        except Exception as error:
+            result['error'] = str(error)
+        output.write(json.dumps(result).encode('utf-8') + b'\n' + (audio or b''))
+        output.flush()
+        # Новое аудио сохраняется в кэш после передачи плейеру:
+        if key is not None and audio is not None:
+            try:
+                cache.put(key, audio)
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    serve(*sys.argv[1:2])
@@ -3,33 +3,41 @@
 извлечь и озвучить в аудиоформате его содержимое. Работает как аудиоплейер,
 позволяет останавливать и возобновлять воспроизведение текста,
 выбирать страницу, хранит сведения о последней прослушанной странице файла
-после закрытия окна GUI для использования при следующем обращении к файлу.
+после закрытия окна GUI для использования при следующем обращении к файлу
+(см. модуль memory).
 Команды для управления плейером осуществляются нажатием клавиш на клавиатуре.
 Преобразование текста в аудио производится постранично, что позволяет
-прослушивать большие файлы, не загружая их в память целиком.
+прослушивать большие файлы, не загружая их в память целиком: текст
+страницы извлекается только при обращении к ней, несколько следующих
+страниц извлекаются заранее в фоновом потоке (см. модуль pages).
+Аудио текущей и нескольких следующих страниц готовится заранее в отдельном
+процессе (см. модуль synthesis), поэтому переход к следующей странице
+выполняется без паузы. Звуковые подсказки озвучиваются в отдельном потоке
+(см. модуль speech) и не блокируют окно программы.
 """
 
-import pyttsx3
-import fitz
 import pygame
-import os
-import json
-import threading
+import io
 
 import tkinter as tk
 from tkinter.filedialog import askopenfilename
 
+from memory import ReaderMemory, quick_fingerprint
+from pages import PageSource
+from speech import Speaker
+from synthesis import Synthesizer
 
-def speak(sentence: str):
-    """Функция озвучивает текстовую строку."""
-    engine.say(sentence)
-    engine.runAndWait()
 
+def speak(sentence: str, interrupt: bool = False):
+    """Функция ставит текстовую строку в очередь озвучивания и сразу
+    возвращает управление (подсказки озвучиваются в отдельном потоке,
+    см. модуль speech). При interrupt=True текущая подсказка прерывается."""
+    speaker.say(sentence, interrupt=interrupt)
 
-# Звуковое сопровождение интерфейса (синхронизировано с открытием диалогового окна):
-engine = pyttsx3.init()
-t = threading.Thread(target=speak, args=['Выберите текстовый файл.'])
-t.start()
+
+# Звуковое сопровождение интерфейса (озвучивается во время открытия диалогового окна):
+speaker = Speaker()
+speak('Выберите текстовый файл.')
 
 # Пользовательский ввод пути к файлу:
 root = tk.Tk()
@@ -39,116 +47,135 @@ file_path = askopenfilename(title='Выберите файл',
 root.destroy()
 
 # Переменные для обработки текста:
-content = []  # Текст постранично
+pages = None  # Страницы текста (извлекаются по мере обращения)
 n_pages = 0
 cur_page = 0
+cur_chunk = 0  # Фрагмент (одно или несколько предложений) текущей страницы
 
 # Для контроля паузы при воспроизведении аудио:
 pause = False
 
-# Память ридера (индекс текущей страницы по ссылке на файл):
-if 'reader_memory.json' not in os.listdir():
-    memory = json.loads('{}')
-else:
-    with open('reader_memory.json', 'r') as f:
-        memory = json.load(f)
-    if file_path in memory:
-        cur_page = memory[file_path]
+# Память ридера (позиция чтения по отпечатку содержимого файла
+# и индексы страниц файлов .txt, см. модуль memory):
+memory = ReaderMemory()
+book = None  # Отпечаток содержимого файла
 
 # Звуковое сопровождение интерфейса:
-t.join()
 speak('Выполняется обработка.')
 
 
 def load_text(path: str):
-    """Функция извлекает текст из файла
-    и преобразует в список строк постранично."""
+    """Функция открывает файл для постраничного извлечения текста.
+    Текст страницы извлекается только при обращении к ней (см. модуль pages)."""
 
-    global content, cur_page, n_pages
+    global pages, book, cur_page, cur_chunk, n_pages
 
     # Если файл не выбран, озвучиваем рекомендацию
     # для пользователя и завершаем программу:
     if path == '':
         speak('Файл не найден. Попробуйте запустить программу и выбрать файл еще раз.')
+        speaker.wait()
         exit()
 
     try:
-        extension = os.path.splitext(path)[1]
-
-        # Для файлов в формате .txt:
-        if extension == '.txt':
-            with open(path, 'r') as f:
-                while True:
-                    # Считываем содержимое фрагментами по 4000 знаков,
-                    # что примерно соответствует одной странице pdf:
-                    data = f.read(4000)
-                    if not data:
-                        break
-                    content.append(data)
-            n_pages = len(content)
-            # Если пользователь сохранил новый текст под названием,
-            # которое уже есть в памяти ридера, и возникла ошибка индексации:
-            if cur_page >= n_pages:
-                cur_page = 0
-
-        # Для файлов в формате .pdf и аналогичных:
-        elif extension in ['.pdf', '.xps', '.oxps', '.epub', '.cbz', '.fb2']:
-            doc = fitz.open(path)
-            n_pages = doc.pageCount
-            if cur_page >= n_pages:
-                cur_page = 0
-
-            for page in range(n_pages):
-                current_page = doc.loadPage(page)
-                cur_text = current_page.getText('text')
-                content.append(cur_text)
+        book = quick_fingerprint(path)
+        pages = PageSource(path, index_store=memory, book=book)
+        n_pages = len(pages)
+        # Продолжаем чтение с сохраненной позиции:
+        saved = memory.position(book)
+        if saved is not None:
+            cur_page, cur_chunk = saved
+        # Если сохраненная позиция не соответствует документу:
+        if cur_page >= n_pages:
+            cur_page, cur_chunk = 0, 0
+        # Извлекаем текущую страницу и запускаем извлечение следующих:
+        pages[cur_page]
 
     # При возникновении ошибок обработки файла, озвучиваем
     # рекомендацию для пользователя и завершаем программу:
     except Exception:
         speak('Произошла ошибка при обработке файла. Попробуйте запустить программу еще раз и выбрать другой файл.')
+        speaker.wait()
         exit()
 
 
-# Преобразуем текст в список строк постранично:
+# Открываем файл для постраничного извлечения текста:
 load_text(file_path)
 
 
-def text_to_audio_file():
-    """Функция преобразует текст текущей страницы в аудиофайл."""
-    engine.save_to_file(content[cur_page], 'reader_audio.wav')
-    engine.runAndWait()
+# Запускаем процесс, который озвучивает текущую и следующие страницы
+# заранее, пока открывается окно и воспроизводится текущая страница
+# (страницы, озвученные ранее, берутся из кэша на диске):
+synthesizer = Synthesizer(pages, document=book)
+if cur_chunk >= len(synthesizer.chunks(cur_page)):
+    cur_chunk = 0
+synthesizer.schedule(cur_page, cur_chunk)
+
+# Для контроля фрагмента, поставленного в очередь воспроизведения
+# после текущего (переход к нему выполняется без паузы):
+queued = False
 
 
-# Преобразуем текущую страницу в аудиофайл в текущей директории:
-text_to_audio_file()
+def save_position():
+    """Функция сохраняет текущую позицию чтения в памяти ридера.
+    Вызывается при каждом переходе к другому фрагменту, поэтому позиция
+    сохраняется и при аварийном завершении программы."""
+    memory.save_position(book, file_path, cur_page, cur_chunk, n_pages)
 
-# При загрузке аудиофайла через pygame.mixer.load
-# мы теряем возможность перезаписывать содержимое файла.
-# Опция pygame.mixer.music.unload не работает.
-# Создаем переменную, которая позволит освобождать файл
-# для записи следующих страниц текста:
-audio_file = open('reader_audio.wav')
+
+def page_sound(page: int, chunk: int) -> pygame.mixer.Sound:
+    """Функция возвращает объект Sound с аудио фрагмента страницы (из памяти, без файлов)."""
+    return pygame.mixer.Sound(file=io.BytesIO(synthesizer.wait(page, chunk)))
 
 
 def play_audio():
-    """Функция запускает воспроизведение аудиофайла.
+    """Функция запускает воспроизведение аудио с текущего фрагмента страницы.
     Вызывается нажатием клавиши 's' на клавиатуре."""
-    pygame.mixer.music.load(audio_file)
-    pygame.mixer.music.play(0)
+
+    global queued
+
+    sound = page_sound(cur_page, cur_chunk)
+    # Остановка прежнего аудио не должна восприниматься как окончание страницы:
+    channel.set_endevent()
+    channel.stop()
+    channel.set_endevent(audio_finished)
+    channel.play(sound)
+    queued = False
+    queue_next_chunk()
+
+
+def queue_next_chunk():
+    """Функция ставит аудио следующего фрагмента в очередь воспроизведения.
+    Если аудио еще не готово, проверка повторяется по таймеру
+    (событие queue_check), пока фрагмент не будет поставлен в очередь."""
+
+    global queued
+
+    waiting = False
+    # Аудио ставится в очередь только во время воспроизведения
+    # (в свободном канале оно начнет воспроизводиться сразу):
+    if not queued and channel.get_busy():
+        position = synthesizer.next_position(cur_page, cur_chunk)
+        if position is not None:
+            if synthesizer.audio(*position) is not None:
+                channel.queue(page_sound(*position))
+                queued = True
+            else:
+                waiting = True
+    pygame.time.set_timer(queue_check, QUEUE_CHECK_MS if waiting else 0)
 
 
 def pause_audio():
     """Функция приостанавливает и возобновляет воспроизведение
-    аудиофайла. Вызывается нажатием клавиши 'p' на клавиатуре."""
+    аудио. Вызывается нажатием клавиши 'p' на клавиатуре."""
 
     global pause
 
     if not pause:
-        pygame.mixer.music.pause()
+        channel.pause()
         pause = True
     else:
-        pygame.mixer.music.unpause()
+        channel.unpause()
         pause = False
 
 
@@ -189,14 +216,43 @@ position_display = header_font.render(position, True, text_color)
 
 # Событие, выполняемое по окончании воспроизведения аудио:
 audio_finished = pygame.USEREVENT + 1
-pygame.mixer.music.set_endevent(audio_finished)
+
+# Событие таймера для проверки готовности аудио следующего фрагмента
+# и интервал проверки, мс:
+queue_check = pygame.USEREVENT + 2
+QUEUE_CHECK_MS = 200
+
+# Движение мыши не используется и не должно пробуждать цикл обработки событий:
+pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+# Канал для воспроизведения аудио страниц (не используется другими звуками):
+pygame.mixer.set_reserved(1)
+channel = pygame.mixer.Channel(0)
+channel.set_endevent(audio_finished)
+
+# Громкость воспроизведения текста во время озвучивания подсказок:
+DUCK_VOLUME = 0.3
+
+
+def duck_audio():
+    """Функция приглушает воспроизведение текста на время подсказки."""
+    channel.set_volume(DUCK_VOLUME)
+
+
+def restore_audio():
+    """Функция восстанавливает громкость воспроизведения текста после подсказки."""
+    channel.set_volume(1.0)
+
+
+# Подсказки, озвучиваемые во время воспроизведения, приглушают текст:
+speaker.on_start = duck_audio
+speaker.on_end = restore_audio
 
 # Звуковое сопровождение интерфейса (инструкция для пользователя):
 audio_instruction = '''Для начала прослушивания текста нажмите клавишу s.
 Для остановки и возобновления прослушивания используйте клавишу p.
 В нижней части окна отображается номер текущей страницы.
 Переход к следующей странице производится автоматически.
-При этом может возникать пауза в пределах одной-двух секунд.
 Вы можете изменить номер страницы. Для этого остановите воспроизведение файла,
 нажмите клавишу c. Введите нужный номер страницы и проверьте, что он корректно
 отображается в нижней части окна. Ошибочно введенное число можно отменить клавишей Backspace.
@@ -205,59 +261,83 @@ audio_instruction = '''Для начала прослушивания текст
 
 
 def window_contents():
-    """Функция наполняет окно программы текстом и виджетами."""
+    """Функция наполняет окно программы текстом и виджетами
+    и обновляет окно целиком (при открытии и перерисовке окна)."""
     screen.fill((166, 230, 247))
-    # Виджет в нижней части экрана для отображения текущей страницы:
-    w = position_display.get_width()
-    h = position_display.get_height()
-    pygame.draw.rect(screen, (83, 130, 207), (0, 520, width, h + 40))
-    pygame.draw.rect(screen, (255, 255, 255), (190, 530, w + 20, h + 20))
-    # Инструкция для пользователя и строка с номером текущей страницы:
+    # Инструкция для пользователя:
     screen.blit(text_header, (50, 40))
     screen.blit(text_1, (80, 130))
     screen.blit(text_2, (80, 210))
     screen.blit(text_3, (80, 290))
     screen.blit(text_4, (80, 370))
     screen.blit(text_5, (80, 450))
-    screen.blit(position_display, (200, 540))
+    draw_position()
     pygame.display.flip()
 
 
+def draw_position() -> pygame.Rect:
+    """Функция рисует виджет в нижней части экрана со строкой
+    с номером текущей страницы и возвращает занимаемую им область."""
+    w = position_display.get_width()
+    h = position_display.get_height()
+    widget = pygame.Rect(0, 520, width, h + 40)
+    pygame.draw.rect(screen, (83, 130, 207), widget)
+    pygame.draw.rect(screen, (255, 255, 255), (190, 530, w + 20, h + 20))
+    screen.blit(position_display, (200, 540))
+    return widget
+
+
+def update_position(position: str):
+    """Функция выводит новую строку с номером страницы,
+    обновляя в окне только область виджета."""
+
+    global position_display
+
+    position_display = header_font.render(position, True, text_color)
+    pygame.display.update(draw_position())
+
+
 def page_entry() -> str:
     """Функция обрабатывает пользовательский ввод номера страницы
     с клавиатуры. Вызывается нажатием клавиши 'c'. Формирует и
     возвращает строку, содержащую номер страницы. Сигналом
     к завершению ввода служит нажатие клавиши 'm'."""
 
-    global position_display
-
     new_page = ''
 
     typing = True
     while typing:
 
-        for page_event in pygame.event.get():
+        # Ожидаем нажатия клавиши без нагрузки на процессор:
+        page_event = pygame.event.wait()
+
+        if page_event.type == pygame.VIDEOEXPOSE:
+            window_contents()
+
+        elif page_event.type == queue_check:
+            queue_next_chunk()
+
+        # Воспроизведение продолжается во время ввода номера страницы:
+        elif page_event.type == audio_finished:
+            if synthesizer.next_position(cur_page, cur_chunk) is not None:
+                next_chunk()
 
-            if page_event.type == pygame.KEYDOWN:
+        elif page_event.type == pygame.KEYDOWN:
 
-                if page_event.key == pygame.K_m:  # Окончание ввода номера страницы
-                    typing = False
+            if page_event.key == pygame.K_m:  # Окончание ввода номера страницы
+                typing = False
 
-                elif page_event.key == pygame.K_BACKSPACE:  # Убрать последний введенный символ
-                    if len(new_page) > 0:
-                        new_page = new_page[:-1]
-                        position = f'Страница {new_page} из {n_pages}'
-                        position_display = header_font.render(position, True, text_color)
-                        window_contents()
+            elif page_event.key == pygame.K_BACKSPACE:  # Убрать последний введенный символ
+                if len(new_page) > 0:
+                    new_page = new_page[:-1]
+                    update_position(f'Страница {new_page} из {n_pages}')
 
-                else:  # Ввод номера страницы
-                    entry = pygame.key.name(page_event.key)
+            else:  # Ввод номера страницы
+                entry = pygame.key.name(page_event.key)
 
-                    if len(entry) == 3 and entry[1] in '0123456789':
-                        new_page += entry[1]
-                        position = f'Страница {new_page} из {n_pages}'
-                        position_display = header_font.render(position, True, text_color)
-                        window_contents()
+                if len(entry) == 3 and entry[1] in '0123456789':
+                    new_page += entry[1]
+                    update_position(f'Страница {new_page} из {n_pages}')
 
     return new_page
 
@@ -267,104 +347,116 @@ def check_page(page: str):
     # Если пользователь ввел номер страницы,
     # проверяем, что такая страница есть в файле:
 
-    global cur_page, audio_file, pause
+    global cur_page, cur_chunk, pause
 
     if len(page) > 0:
         new_ind = int(page) - 1
 
         if 0 <= new_ind <= n_pages - 1:
-            cur_page = new_ind
-            speak(f'Перехожу к странице {page}')
-            audio_file.close()
-            text_to_audio_file()
-            audio_file = open('reader_audio.wav')
+            cur_page, cur_chunk = new_ind, 0
+            # Страница озвучивается одновременно с подсказкой:
+            synthesizer.schedule(cur_page)
+            save_position()
+            speak(f'Перехожу к странице {page}', interrupt=True)
             play_audio()
             pause = False
 
         else:
-            speak(f'В файле нет страницы {page}. Нажмите c, введите номер страницы. В конце нажмите m.')
+            speak(f'В файле нет страницы {page}. Нажмите c, введите номер страницы. В конце нажмите m.', interrupt=True)
     # Если получена пустая строка:
     else:
-        speak('Не указан номер страницы. Нажмите c, введите номер страницы. В конце нажмите m.')
+        speak('Не указан номер страницы. Нажмите c, введите номер страницы. В конце нажмите m.', interrupt=True)
 
 
-def next_page():
-    """Функция осуществляет переход к следующей странице
-    при завершении воспроизведения аудиофайла текущей страницы."""
+def next_chunk():
+    """Функция осуществляет переход к следующему фрагменту (и при необходимости
+    к следующей странице) при завершении воспроизведения текущего фрагмента."""
 
-    global cur_page, position_display, audio_file
+    global cur_page, cur_chunk, queued
 
-    cur_page += 1
-    position = f'Страница {cur_page + 1} из {n_pages}'
-    position_display = header_font.render(position, True, text_color)
-    audio_file.close()
-    text_to_audio_file()
-    audio_file = open('reader_audio.wav')
-    play_audio()
+    page = cur_page
+    cur_page, cur_chunk = synthesizer.next_position(cur_page, cur_chunk)
+    if cur_page != page:
+        update_position(f'Страница {cur_page + 1} из {n_pages}')
+    synthesizer.schedule(cur_page, cur_chunk)
+    save_position()
+    # Если аудио фрагмента было в очереди, оно уже воспроизводится:
+    if queued:
+        queued = False
+        queue_next_chunk()
+    else:
+        play_audio()
 
 
 def window_manager():
-    """Функция обеспечивает воспроизведение аудиофайла,
+    """Функция обеспечивает воспроизведение аудио,
     мониторинг страниц текста и их преобразование в аудио,
-    обрабатывает команды пользовательского ввода с клавиатуры."""
+    обрабатывает команды пользовательского ввода с клавиатуры.
+    Цикл ожидает событий (pygame.event.wait) и не нагружает процессор,
+    окно перерисовывается только при изменении его содержимого."""
 
-    clock = pygame.time.Clock()
+    window_contents()
 
     done = False
     while not done:
 
-        for event in pygame.event.get():
+        event = pygame.event.wait()
 
-            if event.type == pygame.QUIT:
-                done = True
+        if event.type == pygame.QUIT:
+            done = True
 
-            # Пользовательский ввод команд с клавиатуры:
-            elif event.type == pygame.KEYDOWN:
+        # Окно требуется перерисовать (например, после сворачивания):
+        elif event.type == pygame.VIDEOEXPOSE:
+            window_contents()
 
-                if event.key == pygame.K_s:  # 's' - начать воспроизвдение
-                    play_audio()
+        # Пользовательский ввод команд с клавиатуры:
+        elif event.type == pygame.KEYDOWN:
 
-                elif event.key == pygame.K_p:  # 'p' - приостановить/возобновить
-                    pause_audio()
+            if event.key == pygame.K_s:  # 's' - начать воспроизвдение
+                play_audio()
 
-                elif event.key == pygame.K_i:  # 'i' - прослушать инструкцию
-                    speak(audio_instruction)
+            elif event.key == pygame.K_p:  # 'p' - приостановить/возобновить
+                pause_audio()
 
-                elif event.key == pygame.K_q:  # 'q' - закрыть окно программы
-                    done = True
+            elif event.key == pygame.K_i:  # 'i' - прослушать инструкцию
+                speak(audio_instruction, interrupt=True)
 
-                elif event.key == pygame.K_c:  # 'c' - изменить текущую страницу
-                    # Обрабатываем пользовательский ввод:
-                    new_page = page_entry()
-                    # Проверяем корректность полученного номера:
-                    check_page(new_page)
+            elif event.key == pygame.K_q:  # 'q' - закрыть окно программы
+                done = True
 
-            # Завершение воспроизведения текущей страницы:
-            elif event.type == audio_finished:
-                # Если это не последняя страница текста:
-                if cur_page < n_pages - 1:
-                    next_page()
-                else:
-                    done = True
+            elif event.key == pygame.K_c:  # 'c' - изменить текущую страницу
+                # Обрабатываем пользовательский ввод:
+                new_page = page_entry()
+                # Проверяем корректность полученного номера:
+                check_page(new_page)
+
+        # Завершение воспроизведения текущего фрагмента:
+        elif event.type == audio_finished:
+            # Если это не последний фрагмент текста:
+            if synthesizer.next_position(cur_page, cur_chunk) is not None:
+                next_chunk()
+            else:
+                done = True
 
-        window_contents()
-        clock.tick(30)
+        # Проверка готовности аудио следующего фрагмента:
+        elif event.type == queue_check:
+            queue_next_chunk()
 
 
 # Запуск функции управления окном пользовательского интерфейса:
 window_manager()
 
 # Завершение процессов после закрытия окна:
+speaker.close()
 pygame.quit()
-audio_file.close()
+synthesizer.close()
+pages.close()
 
-# Обновляем индекс текущей страницы в памяти ридера:
+# Обновляем позицию чтения в памяти ридера:
 if cur_page < n_pages - 1:
-    memory[file_path] = cur_page
-# Если файл прослушан до последней страницы, удаляем ссылку:
+    save_position()
+# Если файл прослушан до последней страницы, удаляем позицию:
 else:
-    if file_path in memory:
-        del memory[file_path]
+    memory.forget(book)
 
-with open('reader_memory.json', 'w') as f:
-    json.dump(memory, f, indent=2)
+memory.close()